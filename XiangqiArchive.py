@@ -0,0 +1,357 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: A compact binary archive of Xiangqi games. Every move is one 16 bit value, start * 90 + end square index
+# as in XiangqiBook, so a 60 move game takes 124 bytes instead of the 360 or so of its text move list. Games are stored
+# back to back and followed by an index of their offsets, so Archive can memory map a file and read any game without
+# touching the ones before it, while stream_games reads them in order from any file object, i.e. a pipe or a gzip file.
+# From the command line:
+#     python XiangqiArchive.py games.txt games.xqa          convert a game record file
+#     python XiangqiArchive.py games.xqa --dump             print an archive back as a game record file
+#
+# The file is a 24 byte header, "XQAR", the format version, the game count and the offset of the index, then the games,
+# then the index of 64 bit game offsets. A game is its number of moves and the length of its starting position's FEN,
+# both 16 bit, then the FEN, empty for games starting from the opening, then the moves. All little endian.
+
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+
+from XiangqiGame import SQUARE_INDEX, SQUARE_NAMES, SQUARES, START_FEN, XiangqiGame, parse_fen
+from XiangqiReplay import read_records, split_record
+
+MAGIC = b"XQAR"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQ")  # magic, version, number of games, offset of the index
+GAME = struct.Struct("<HH")  # number of moves, length of the starting FEN
+MAX_MOVES = 0xFFFF
+EXTENSION = ".xqa"
+
+
+def encode_move(start, end):
+    """
+    returns a move packed into 16 bits
+    :param start - square index of the piece
+    :param end - square index of the destination
+    """
+    return start * SQUARES + end
+
+
+def decode_move(move):
+    """
+    returns the (start, end) square indices of a move packed by encode_move
+    :param move - packed move
+    """
+    return divmod(move, SQUARES)
+
+
+def _square(square):
+    """
+    returns the square index of a square, raises ValueError for a malformed coordinate or an index off the board
+    :param square - square index or algebraic coordinate, i.e. 70 or "b3"
+    """
+    if type(square) is str:
+        square = SQUARE_INDEX.get(square)
+    if type(square) is not int or not 0 <= square < SQUARES:
+        raise ValueError("malformed move in game record")
+    return square
+
+
+def encode_game(moves, fen=None):
+    """
+    returns the game record of a game, raises ValueError for a malformed move or FEN
+    :param moves - (start, end) pairs of square indices or algebraic coordinates, i.e. (70, 67) or ("b3", "e3")
+    :param fen - starting position in FEN, or None for the opening position
+    """
+    packed = array("H")
+    for move in moves:
+        if move is None:
+            raise ValueError("malformed move in game record")
+        start, end = move
+        packed.append(encode_move(_square(start), _square(end)))
+    if len(packed) > MAX_MOVES:
+        raise ValueError("a game record holds at most " + str(MAX_MOVES) + " moves")
+    if sys.byteorder != "little":
+        packed.byteswap()
+    if fen == START_FEN:
+        fen = None
+    if fen:
+        parse_fen(fen)
+    fen = fen.encode("ascii") if fen else b""
+    return GAME.pack(len(packed), len(fen)) + fen + packed.tobytes()
+
+
+def decode_game(record):
+    """
+    returns the starting FEN, None for the opening position, and the list of (start, end) moves of a game record,
+    raises ValueError if the bytes aren't a game record
+    :param record - game record bytes
+    """
+    if len(record) < GAME.size:
+        raise ValueError("not a game record")
+    count, fen_length = GAME.unpack_from(record, 0)
+    moves_at = GAME.size + fen_length
+    if len(record) != moves_at + 2 * count:
+        raise ValueError("not a game record")
+    fen = bytes(record[GAME.size:moves_at]).decode("ascii") or None
+    packed = array("H", bytes(record[moves_at:]))
+    if sys.byteorder != "little":
+        packed.byteswap()
+    if count and max(packed) >= SQUARES * SQUARES:
+        raise ValueError("not a game record")
+    return fen, [divmod(move, SQUARES) for move in packed]
+
+
+def record_size(record, offset=0):
+    """
+    returns the size of the game record starting at an offset, from its header alone, raises ValueError if the header
+    is cut short
+    :param record - bytes holding the game record
+    :param offset - where the game record starts
+    """
+    if not 0 <= offset <= len(record) - GAME.size:
+        raise ValueError("not a game record")
+    count, fen_length = GAME.unpack_from(record, offset)
+    return GAME.size + fen_length + 2 * count
+
+
+class ArchiveWriter:
+    """
+    Represents an archive file being written, with methods to add games and to finish the file by writing its index.
+    """
+
+    def __init__(self, path):
+        """
+        Constructs an archive writer with private data members of the file and the offsets of the games written.
+        :param path - archive file to write
+        """
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0, 0))  # filled in by close
+        self._offsets = array("Q")
+        self._offset = HEADER.size
+
+    def __len__(self):
+        """returns the number of games written"""
+        return len(self._offsets)
+
+    def __enter__(self):
+        """returns the writer for use in a with statement"""
+        return self
+
+    def __exit__(self, *exc):
+        """finishes the archive at the end of a with statement"""
+        self.close()
+
+    def add_record(self, record):
+        """
+        writes a game record
+        :param record - game record bytes, i.e. from encode_game or XiangqiGame.export_record
+        """
+        self._offsets.append(self._offset)
+        self._file.write(record)
+        self._offset += len(record)
+
+    def add_moves(self, moves, fen=None):
+        """
+        writes a game from its moves
+        :param moves - (start, end) pairs of square indices or algebraic coordinates
+        :param fen - starting position in FEN, or None for the opening position
+        """
+        self.add_record(encode_game(moves, fen))
+
+    def add_game(self, game):
+        """
+        writes the moves made in a XiangqiGame
+        :param game - XiangqiGame to write
+        """
+        self.add_record(game.export_record())
+
+    def close(self):
+        """writes the index and the header, then closes the file"""
+        if self._file is None:
+            return
+        padding = -self._offset % 8  # keep the index aligned for the memory mapped reader
+        self._file.write(bytes(padding))
+        index_offset = self._offset + padding
+        offsets = self._offsets
+        if sys.byteorder != "little":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+        self._file.write(offsets.tobytes())
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(self._offsets), index_offset))
+        self._file.close()
+        self._file = None
+
+
+def write_archive(games, path):
+    """
+    writes games to an archive file, returns the number of games written and the number skipped because they had a
+    malformed move or FEN
+    :param games - iterable of move lists or (fen, moves) records, read lazily, see encode_game
+    :param path - archive file to write
+    """
+    skipped = 0
+    with ArchiveWriter(path) as writer:
+        for game in games:
+            fen, moves = split_record(game)
+            try:
+                record = encode_game(moves, fen)
+            except ValueError:
+                skipped += 1
+                continue
+            writer.add_record(record)
+        return len(writer), skipped
+
+
+class Archive:
+    """
+    Represents an archive file opened read only with mmap, with methods to read any game by its index without reading
+    the games before it and to iterate over the games in order.
+    """
+
+    def __init__(self, path):
+        """
+        Constructs an archive from a file written by ArchiveWriter, with private data members of the file, its memory
+        map and the index of game offsets.
+        :param path - archive file
+        """
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file can't be mapped
+            self._file.close()
+            raise ValueError(path + " is not a game archive")
+        self._index = None
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(path + " is not a game archive")
+        magic, version, count, index_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or index_offset < HEADER.size or \
+                len(self._map) != index_offset + 8 * count:
+            self.close()
+            raise ValueError(path + " is not a game archive")
+        self._count = count
+        self._index_offset = index_offset
+        index = memoryview(self._map)[index_offset:].cast("Q")
+        if sys.byteorder != "little":
+            index = array("Q", index)
+            index.byteswap()
+        self._index = index
+
+    def __len__(self):
+        """returns the number of games in the archive"""
+        return self._count
+
+    def __enter__(self):
+        """returns the archive for use in a with statement"""
+        return self
+
+    def __exit__(self, *exc):
+        """closes the archive at the end of a with statement"""
+        self.close()
+
+    def close(self):
+        """unmaps and closes the archive file"""
+        if self._map is not None:
+            if isinstance(self._index, memoryview):
+                self._index.release()  # the map can't close while a view of it is held
+            self._index = None
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def __getitem__(self, index):
+        """
+        returns a game record, seeking straight to it through the index
+        :param index - game index, negative counting from the end
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("game index out of range")
+        offset = self._index[index]
+        return self._map[offset:offset + record_size(self._map, offset)]
+
+    def __iter__(self):
+        """yields every game record in order"""
+        data = self._map
+        offset = HEADER.size
+        for _ in range(self._count):
+            size = record_size(data, offset)
+            yield data[offset:offset + size]
+            offset += size
+
+    def get_moves(self, index):
+        """
+        returns the starting FEN, None for the opening position, and the (start, end) moves of a game
+        :param index - game index
+        """
+        return decode_game(self[index])
+
+    def get_game(self, index, backend=None):
+        """
+        returns a XiangqiGame replayed from a game
+        :param index - game index
+        :param backend - Board class to play on, or None for Board
+        """
+        game = XiangqiGame(backend=backend)
+        game.load_record(self[index])
+        return game
+
+
+def stream_games(file):
+    """
+    yields every game record of an archive read in order from a binary file object, without seeking or the index
+    :param file - binary file object positioned at the start of an archive, i.e. open(path, "rb") or sys.stdin.buffer
+    """
+    header = file.read(HEADER.size)
+    if len(header) != HEADER.size:
+        raise ValueError("not a game archive")
+    magic, version, count, index_offset = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a game archive")
+    for _ in range(count):
+        head = file.read(GAME.size)
+        if len(head) != GAME.size:
+            raise ValueError("game archive ends early")
+        size = record_size(head) - GAME.size
+        body = file.read(size)
+        if len(body) != size:
+            raise ValueError("game archive ends early")
+        yield head + body
+
+
+def main(argv=None):
+    """
+    converts a game record file to an archive, or prints an archive as a game record file, from the command line
+    :param argv - command line arguments, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Convert Xiangqi game record files to and from game archives")
+    parser.add_argument("source", help="game record file, one game per line, or an archive with --dump")
+    parser.add_argument("archive", nargs="?", help="archive file to write")
+    parser.add_argument("--dump", action="store_true", help="print the games of an archive as a game record file")
+    args = parser.parse_args(argv)
+    if args.dump:
+        with open(args.source, "rb") as file:
+            for record in stream_games(file):
+                fen, moves = decode_game(record)
+                line = " ".join(SQUARE_NAMES[start] + "-" + SQUARE_NAMES[end] for start, end in moves)
+                # a game with no moves would be a blank line, which is skipped, so it keeps its FEN
+                if fen is not None or not moves:
+                    line = (fen or START_FEN) + ": " + line
+                print(line.rstrip())
+        return 0
+    if args.archive is None:
+        parser.error("an archive file to write is needed")
+    count, skipped = write_archive(read_records(args.source), args.archive)
+    print(str(count) + " games written to " + args.archive, file=sys.stderr)
+    if skipped:
+        print(str(skipped) + " games with a malformed move or FEN skipped", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
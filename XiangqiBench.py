@@ -0,0 +1,224 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: Perft correctness counts and throughput benchmarks for the Xiangqi Board and XiangqiGame. Running this
+# file checks perft against the reference positions on every Board backend, Board and XiangqiBitboard.BitBoard, so a
+# move generation bug in either fails the run, then times move generation, make_move, gen_check and the
+# stalemate scan, measures the memory each game holds, and writes the results as JSON so runs can be compared, i.e.
+#     python XiangqiBench.py --depth 3 --output bench.json
+#     python XiangqiBench.py --depth 4 --backend bitboard
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from XiangqiBitboard import BitBoard
+from XiangqiGame import Board, XiangqiGame
+
+BACKENDS = {"board": Board, "bitboard": BitBoard}  # Board classes checked by check_perft, by command line name
+
+# Reference positions as moves played from the opening, with the perft node count for each depth starting at 1.
+# The opening counts are the published Xiangqi perft numbers. The other two positions were counted with a separate,
+# straightforward move generator and agree with Board.perft.
+REFERENCE_POSITIONS = (
+    {"name": "opening", "moves": [],
+     "nodes": [44, 1920, 79666, 3290240, 133312995, 5392831844]},
+    {"name": "open files",
+     "moves": [("h3", "h10"), ("i10", "h10"), ("b3", "b10"), ("b8", "b5"), ("b10", "d10"), ("e10", "d10"),
+               ("i1", "i3"), ("h8", "b8"), ("i3", "a3"), ("b5", "b3"), ("a4", "a5"), ("c10", "a8")],
+     "nodes": [18, 886, 18313]},
+    {"name": "endgame",
+     "moves": [("b3", "b10"), ("a10", "b10"), ("h3", "h10"), ("i10", "h10"), ("h1", "g3"), ("b8", "b5"),
+               ("c4", "c5"), ("c10", "e8"), ("c1", "a3"), ("a7", "a6"), ("e4", "e5"), ("b5", "e5"), ("c5", "c6"),
+               ("b10", "b2"), ("b1", "d2"), ("g10", "i8"), ("c6", "c7"), ("b2", "d2"), ("c7", "d7"), ("d2", "d1"),
+               ("a1", "d1"), ("e5", "c5"), ("a3", "c5"), ("h8", "g8"), ("a4", "a5"), ("g8", "g4"), ("d7", "e7"),
+               ("a6", "a5"), ("d1", "d10"), ("e10", "d10"), ("e7", "e8"), ("g4", "g1"), ("i1", "g1"), ("h10", "h5"),
+               ("g3", "h5"), ("a5", "b5"), ("h5", "i7"), ("i8", "g10"), ("e8", "d8"), ("b5", "c5")],
+     "nodes": [19, 130, 2677]},
+)
+
+
+def reference_game(position, backend=None):
+    """
+    returns a XiangqiGame with a reference position's moves played
+    :param position - entry of REFERENCE_POSITIONS
+    :param backend - Board class to play on, or None for Board
+    """
+    game = XiangqiGame(backend=backend)
+    for move_from, move_to in position["moves"]:
+        if not game.make_move(move_from, move_to):
+            raise ValueError("move " + move_from + move_to + " in " + position["name"] + " is not valid")
+    return game
+
+
+def check_perft(depth, backends=None):
+    """
+    compares perft with the reference counts up to a depth on each backend, returns a list of result dictionaries
+    :param depth - deepest perft depth to check
+    :param backends - names in BACKENDS to check, or None for all of them
+    """
+    results = []
+    for name in backends or BACKENDS:
+        for position in REFERENCE_POSITIONS:
+            results.extend(_check_position(position, depth, name))
+    return results
+
+
+def _check_position(position, depth, backend):
+    """
+    returns the perft result dictionaries of one reference position on one backend
+    :param position - entry of REFERENCE_POSITIONS
+    :param depth - deepest perft depth to check
+    :param backend - name in BACKENDS
+    """
+    results = []
+    board = reference_game(position, BACKENDS[backend]).get_board_object()
+    for level in range(1, min(depth, len(position["nodes"])) + 1):
+        started = time.perf_counter()
+        nodes = board.perft(level)
+        seconds = time.perf_counter() - started
+        results.append({"backend": backend, "position": position["name"], "depth": level, "nodes": nodes,
+                        "expected": position["nodes"][level - 1], "passed": nodes == position["nodes"][level - 1],
+                        "seconds": seconds, "nodes_per_second": nodes / seconds if seconds else None})
+    return results
+
+
+def _rate(function, seconds):
+    """
+    calls a function repeatedly for about a number of seconds, returns calls per second
+    :param function - function taking no arguments, returning how many calls it made
+    :param seconds - time to spend
+    """
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0
+    while elapsed < seconds:
+        calls += function()
+        elapsed = time.perf_counter() - started
+    return calls / elapsed
+
+
+def bench_move_generation(seconds):
+    """returns the legal moves generated per second over the reference positions"""
+    boards = [reference_game(position).get_board_object() for position in REFERENCE_POSITIONS]
+
+    def generate():
+        """generates every reference position's moves once"""
+        return sum(len(board.moves()) for board in boards)
+
+    return _rate(generate, seconds)
+
+
+def bench_make_move(seconds):
+    """returns XiangqiGame.make_move calls per second replaying the endgame reference moves"""
+    moves = REFERENCE_POSITIONS[2]["moves"]
+
+    def replay():
+        """replays the moves on a new game"""
+        game = XiangqiGame()
+        for move_from, move_to in moves:
+            game.make_move(move_from, move_to)
+        return len(moves)
+
+    return _rate(replay, seconds)
+
+
+def bench_gen_check(seconds):
+    """returns Board.gen_check calls per second over the reference positions"""
+    boards = [reference_game(position).get_board_object() for position in REFERENCE_POSITIONS]
+
+    def check():
+        """checks both players on every reference position"""
+        for board in boards:
+            board.gen_check("RED")
+            board.gen_check("BLACK")
+        return 2 * len(boards)
+
+    return _rate(check, seconds)
+
+
+def bench_stalemate(seconds):
+    """returns the average milliseconds of Board.stalemate and Board.has_legal_move over the reference positions"""
+    boards = [reference_game(position).get_board_object() for position in REFERENCE_POSITIONS]
+
+    def stalemate():
+        """runs the full two player scan on every reference position"""
+        for board in boards:
+            board.stalemate()
+        return len(boards)
+
+    def has_legal_move():
+        """runs the early exit scan for the player to move on every reference position"""
+        for board in boards:
+            board.has_legal_move(board.get_turn(), board.in_check())
+        return len(boards)
+
+    return {"stalemate_ms": 1000 / _rate(stalemate, seconds),
+            "has_legal_move_ms": 1000 / _rate(has_legal_move, seconds)}
+
+
+def bench_memory(games=1000):
+    """
+    returns the average bytes allocated per idle XiangqiGame, new and after the endgame reference moves, measured with
+    tracemalloc over a number of games kept alive at once
+    :param games - number of games to allocate
+    """
+    moves = REFERENCE_POSITIONS[2]["moves"]
+    XiangqiGame().make_moves(moves)  # build any lazily created shared tables first
+    results = {}
+    for name, played in (("new_game_bytes", []), ("played_game_bytes", moves)):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = []
+        for _ in range(games):
+            game = XiangqiGame()
+            game.make_moves(played)
+            kept.append(game)
+        results[name] = (tracemalloc.get_traced_memory()[0] - before) / games
+        tracemalloc.stop()
+        del kept
+    return results
+
+
+def run(depth=3, seconds=1.0, backends=None):
+    """
+    runs the perft checks and every benchmark, returns the results as a dictionary
+    :param depth - deepest perft depth to check
+    :param seconds - time to spend on each throughput benchmark
+    :param backends - names in BACKENDS to check perft on, or None for all of them
+    """
+    results = {"python": platform.python_version(), "platform": platform.platform(),
+               "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "perft": check_perft(depth, backends),
+               "move_generation_per_second": bench_move_generation(seconds),
+               "make_move_per_second": bench_make_move(seconds), "gen_check_per_second": bench_gen_check(seconds)}
+    results.update(bench_stalemate(seconds))
+    results.update(bench_memory())
+    return results
+
+
+def main(argv=None):
+    """
+    runs the benchmarks from the command line, prints the results and writes them as JSON, returns 1 if a perft count
+    was wrong
+    :param argv - command line arguments, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Xiangqi perft checks and throughput benchmarks")
+    parser.add_argument("--depth", type=int, default=3, help="deepest perft depth to check")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time to spend on each throughput benchmark")
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS),
+                        help="Board backend to check perft on, repeat for more, default all")
+    args = parser.parse_args(argv)
+    results = run(args.depth, args.seconds, args.backend)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    return 0 if all(result["passed"] for result in results["perft"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
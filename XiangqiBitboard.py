@@ -0,0 +1,350 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: A bitboard backend for the Xiangqi Board. BitBoard keeps one 90 bit Python integer per piece code next
+# to the Board's bytearray, plus occupancy masks for each player, the whole board and the board read by columns.
+# Chariot and cannon moves come from precomputed row and column occupancy lookups, horse and elephant moves from masks
+# that check their legs and eyes, so questions such as "is the general attacked" or "which squares does red attack"
+# are a handful of integer operations. It is a drop in replacement for Board, i.e.
+#     game = XiangqiGame(backend=BitBoard)
+
+from XiangqiGame import (ADVISOR, CANNON, CHARIOT, COLUMNS, ELEPHANT, GENERAL, HORSE, PLAYER_INDEX,
+                         ROWS, SOLDIER, SQUARES, Board, _ADVISOR_MOVES, _ELEPHANT_MOVES, _GENERAL_MOVES,
+                         _HORSE_ATTACKERS, _HORSE_MOVES, _SOLDIER_ATTACKERS, _SOLDIER_MOVES)
+
+ROW_MASK = (1 << COLUMNS) - 1  # the nine bits of one row
+COLUMN_MASK = (1 << ROWS) - 1  # the ten bits of one column in the column ordered occupancy
+FULL = (1 << SQUARES) - 1
+
+
+def _mask(squares):
+    """returns the bitboard with a bit set for every square index given"""
+    mask = 0
+    for sq in squares:
+        mask |= 1 << sq
+    return mask
+
+
+def _line_tables(length):
+    """
+    builds the chariot and cannon lookups for a line of squares, indexed by position on the line and the line's
+    occupancy bits; chariot entries hold the squares up to and including the first piece each way, cannon entries
+    hold the squares past the first piece, the "screen", up to and including the next piece each way
+    :param length - squares on the line
+    """
+    chariot, cannon = [], []
+    for position in range(length):
+        chariot_row, cannon_row = [], []
+        for occupancy in range(1 << length):
+            slides = jumps = 0
+            for step in (-1, 1):
+                at = position + step
+                screen = False
+                while 0 <= at < length:
+                    if screen:
+                        jumps |= 1 << at
+                    else:
+                        slides |= 1 << at
+                    if occupancy >> at & 1:
+                        if screen:
+                            break
+                        screen = True
+                    at += step
+            chariot_row.append(slides)
+            cannon_row.append(jumps)
+        chariot.append(tuple(chariot_row))
+        cannon.append(tuple(cannon_row))
+    return tuple(chariot), tuple(cannon)
+
+
+_ROW_CHARIOT, _ROW_CANNON = _line_tables(COLUMNS)
+_COLUMN_CHARIOT, _COLUMN_CANNON = _line_tables(ROWS)
+# bitboard of column 0 for each ten bit column pattern, shifted left by the column number to place it
+_COLUMN_SPREAD = tuple(_mask(row * COLUMNS for row in range(ROWS) if pattern >> row & 1)
+                       for pattern in range(1 << ROWS))
+_COLUMN_BIT = tuple(1 << (sq % COLUMNS * ROWS + sq // COLUMNS) for sq in range(SQUARES))
+
+_GENERAL_MASKS = tuple(_mask(moves) for moves in _GENERAL_MOVES)
+_ADVISOR_MASKS = tuple(_mask(moves) for moves in _ADVISOR_MOVES)
+_SOLDIER_MASKS = tuple(tuple(_mask(moves) for moves in player) for player in _SOLDIER_MOVES)
+_SOLDIER_ATTACKER_MASKS = tuple(tuple(_mask(squares) for squares in player) for player in _SOLDIER_ATTACKERS)
+# (eye bit, target bit) for each elephant move, (leg bit, targets) for each of a horse's four legs
+_ELEPHANT_EYES = tuple(tuple((1 << eye, 1 << to) for to, eye in moves) for moves in _ELEPHANT_MOVES)
+
+
+def _group_legs(moves):
+    """
+    returns (leg bit, squares mask) pairs with the squares sharing each leg combined
+    :param moves - (square, leg) pairs
+    """
+    legs = {}
+    for sq, leg in moves:
+        legs[leg] = legs.get(leg, 0) | 1 << sq
+    return tuple((1 << leg, mask) for leg, mask in legs.items())
+
+
+_HORSE_LEGS = tuple(_group_legs(moves) for moves in _HORSE_MOVES)
+_HORSE_ATTACKER_LEGS = tuple(_group_legs(attackers) for attackers in _HORSE_ATTACKERS)
+
+# squares on a general's row and column plus its diagonal neighbours, the horse legs: while the general isn't in check
+# only a move from or to one of these squares can expose it
+_EXPOSURE = tuple(_mask(other for other in range(SQUARES)
+                        if other != sq and (other // COLUMNS == sq // COLUMNS or other % COLUMNS == sq % COLUMNS or
+                                            abs(other // COLUMNS - sq // COLUMNS) == abs(other % COLUMNS - sq % COLUMNS)
+                                            == 1))
+                  for sq in range(SQUARES))
+
+
+def _chariot_attacks(sq, occupied, columns):
+    """
+    returns the bitboard of squares a chariot on square sq attacks, up to and including the first piece each way
+    :param sq - square index of the chariot
+    :param occupied - occupancy bitboard
+    :param columns - the same occupancy ordered by column
+    """
+    row, col = divmod(sq, COLUMNS)
+    shift = row * COLUMNS
+    return (_ROW_CHARIOT[col][occupied >> shift & ROW_MASK] << shift) | \
+        (_COLUMN_SPREAD[_COLUMN_CHARIOT[row][columns >> col * ROWS & COLUMN_MASK]] << col)
+
+
+def _cannon_attacks(sq, occupied, columns):
+    """
+    returns the bitboard of squares a cannon on square sq attacks, past its screen up to and including the next piece
+    :param sq - square index of the cannon
+    :param occupied - occupancy bitboard
+    :param columns - the same occupancy ordered by column
+    """
+    row, col = divmod(sq, COLUMNS)
+    shift = row * COLUMNS
+    return (_ROW_CANNON[col][occupied >> shift & ROW_MASK] << shift) | \
+        (_COLUMN_SPREAD[_COLUMN_CANNON[row][columns >> col * ROWS & COLUMN_MASK]] << col)
+
+
+def _squares_of(mask):
+    """returns the list of square indices set in a bitboard"""
+    squares = []
+    while mask:
+        low = mask & -mask
+        squares.append(low.bit_length() - 1)
+        mask ^= low
+    return squares
+
+
+class BitBoard(Board):
+    """
+    Represents a Xiangqi game board with the Board interface, backed by 90 bit integer bitboards for move generation
+    and check detection. The Board's bytearray of piece codes is kept as well for piece lookups by square.
+    """
+
+    __slots__ = ("_pieces", "_colors", "_occupied", "_columns")
+
+    def set_position(self, squares, player="RED", clock=0, move_number=1):
+        """
+        replaces the position with 90 piece codes and a player to move, clearing the move stack, and rebuilds the
+        bitboards
+        :param squares - 90 piece codes indexed by row * 9 + column
+        :param player - 'RED' or 'BLACK', the player to move
+        :param clock - moves since the last capture
+        :param move_number - full move number, starting at 1
+        """
+        super().set_position(squares, player, clock, move_number)
+        self._pieces = [0] * 16  # bitboard of every piece code
+        self._colors = [0, 0]  # bitboard of each player's pieces
+        self._occupied = 0
+        self._columns = 0  # occupancy with bit column * 10 + row, so a column is ten adjacent bits
+        for sq, code in enumerate(self._squares):
+            if code:
+                self._toggle(code, sq)
+
+    def _toggle(self, code, sq):
+        """
+        adds or removes a piece code on a square in every bitboard
+        :param code - piece code
+        :param sq - square index
+        """
+        bit = 1 << sq
+        self._pieces[code] ^= bit
+        self._colors[code >> 3] ^= bit
+        self._occupied ^= bit
+        self._columns ^= _COLUMN_BIT[sq]
+
+    def make_move(self, start, end):
+        """
+        moves a piece without checking the move and pushes it on the move stack, returns the captured piece code
+        :param start - square index of the piece
+        :param end - square index of the destination
+        """
+        code = self._squares[start]
+        captured = super().make_move(start, end)
+        if captured:
+            self._toggle(captured, end)
+        self._toggle(code, start)
+        self._toggle(code, end)
+        return captured
+
+    def unmake_move(self):
+        """takes back the last move on the move stack and returns its record"""
+        record = super().unmake_move()
+        start, end, captured = record[0], record[1], record[2]
+        code = self._squares[start]
+        self._toggle(code, end)
+        self._toggle(code, start)
+        if captured:
+            self._toggle(captured, end)
+        return record
+
+    def get_bitboard(self, code):
+        """
+        returns the bitboard of a piece code, bit row * 9 + column set for every square it is on
+        :param code - piece code
+        """
+        return self._pieces[code]
+
+    def get_occupied(self, player=None):
+        """
+        returns the bitboard of a player's pieces, or of every piece
+        :param player - 'RED', 'BLACK' or None for both
+        """
+        return self._occupied if player is None else self._colors[PLAYER_INDEX[player]]
+
+    def _piece_moves(self, code, sq):
+        """
+        returns the bitboard of squares a piece can move to, not counting check or the player's own pieces
+        :param code - piece code
+        :param sq - square index of the piece
+        """
+        kind = code & 7
+        occupied = self._occupied
+        if kind == CHARIOT:
+            return _chariot_attacks(sq, occupied, self._columns)
+        if kind == CANNON:
+            return (_chariot_attacks(sq, occupied, self._columns) & ~occupied) | \
+                (_cannon_attacks(sq, occupied, self._columns) & occupied)
+        if kind == HORSE:
+            moves = 0
+            for leg, targets in _HORSE_LEGS[sq]:
+                if not occupied & leg:
+                    moves |= targets
+            return moves
+        if kind == ELEPHANT:
+            moves = 0
+            for eye, target in _ELEPHANT_EYES[sq]:
+                if not occupied & eye:
+                    moves |= target
+            return moves
+        if kind == SOLDIER:
+            return _SOLDIER_MASKS[code >> 3][sq]
+        if kind == ADVISOR:
+            return _ADVISOR_MASKS[sq]
+        return _GENERAL_MASKS[sq]
+
+    def _targets(self, code, start):
+        """
+        returns the squares a piece on square start can reach, not counting check
+        :param code - piece code being moved
+        :param start - square index of the piece
+        """
+        return _squares_of(self._piece_moves(code, start) & ~self._colors[code >> 3])
+
+    def moves(self, captures_only=False):
+        """
+        returns a tuple of (start, end) square indices of every legal move for the player to move
+        :param captures_only - True to return only the moves that capture a piece
+        """
+        if not captures_only:
+            moves = self._cached_moves()
+            if moves is not None:
+                return moves
+        squares = self._squares
+        turn = self._turn
+        allowed = self._colors[turn ^ 1] if captures_only else ~self._colors[turn] & FULL
+        general = self._generals[turn]
+        exposure = FULL if self._attacked(general, turn ^ 1) else _EXPOSURE[general]
+        moves = []
+        for sq in _squares_of(self._colors[turn]):
+            code = squares[sq]
+            # the general's moves and moves from or to its lines are checked, the rest can't expose it
+            checked = FULL if sq == general or exposure >> sq & 1 else exposure
+            for end in _squares_of(self._piece_moves(code, sq) & allowed):
+                if not checked >> end & 1 or self._is_legal(code, sq, end):
+                    moves.append((sq, end))
+        moves = tuple(moves)
+        if not captures_only:
+            self._cache_moves(moves)
+        return moves
+
+    def _is_legal(self, code, start, end):
+        """
+        returns True if a move doesn't leave the player's general in check or facing the other general, worked out on
+        copies of the occupancy masks so the bitboards aren't touched
+        :param code - piece code being moved
+        :param start - square index of the piece
+        :param end - square index of the destination
+        """
+        color = code >> 3
+        end_bit = 1 << end
+        occupied = (self._occupied ^ 1 << start) | end_bit
+        columns = (self._columns ^ _COLUMN_BIT[start]) | _COLUMN_BIT[end]
+        general = end if code & 7 == GENERAL else self._generals[color]
+        if _chariot_attacks(general, occupied, columns) & self._pieces[GENERAL | (color ^ 1) << 3]:
+            return False
+        return not self._attacked_in(general, color ^ 1, occupied, columns, ~end_bit)
+
+    def _attacked(self, sq, color):
+        """
+        returns True if any of a player's pieces attack a square
+        :param sq - square index being attacked
+        :param color - 0 for red, 1 for black
+        """
+        return self._attacked_in(sq, color, self._occupied, self._columns, FULL)
+
+    def _attacked_in(self, sq, color, occupied, columns, alive):
+        """
+        returns True if any of a player's pieces attack a square with the given occupancy
+        :param sq - square index being attacked
+        :param color - 0 for red, 1 for black
+        :param occupied - occupancy bitboard
+        :param columns - the same occupancy ordered by column
+        :param alive - mask of squares whose pieces count, clearing a piece that would be captured
+        """
+        pieces = self._pieces
+        base = color << 3
+        if _chariot_attacks(sq, occupied, columns) & pieces[CHARIOT | base] & alive or \
+                _cannon_attacks(sq, occupied, columns) & pieces[CANNON | base] & alive:
+            return True
+        horses = pieces[HORSE | base] & alive
+        if horses:
+            for leg, squares in _HORSE_ATTACKER_LEGS[sq]:
+                if horses & squares and not occupied & leg:
+                    return True
+        if (_SOLDIER_ATTACKER_MASKS[color][sq] & pieces[SOLDIER | base] | _ADVISOR_MASKS[sq] & pieces[ADVISOR | base]
+                | _GENERAL_MASKS[sq] & pieces[GENERAL | base]) & alive:
+            return True
+        elephants = pieces[ELEPHANT | base] & alive
+        if elephants:
+            for eye, target in _ELEPHANT_EYES[sq]:
+                if elephants & target and not occupied & eye:
+                    return True
+        return False
+
+    def generals_facing(self):
+        """returns True if the two generals are on the same column with no pieces between them"""
+        red, black = self._generals
+        return red % COLUMNS == black % COLUMNS and \
+            bool(_chariot_attacks(red, self._occupied, self._columns) & 1 << black)
+
+    def attack_mask(self, player):
+        """
+        returns the bitboard of every square a player's pieces attack, including squares held by the player
+        :param player - 'RED' or 'BLACK'
+        """
+        color = PLAYER_INDEX[player]
+        squares = self._squares
+        mask = 0
+        for sq in _squares_of(self._colors[color]):
+            code = squares[sq]
+            if code & 7 == CANNON:
+                mask |= _cannon_attacks(sq, self._occupied, self._columns)
+            else:
+                mask |= self._piece_moves(code, sq)
+        return mask
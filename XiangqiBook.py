@@ -0,0 +1,187 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: A memory mapped Xiangqi opening book. A book is built from a game collection into a binary file of
+# fixed size records sorted by position key, and opened read only with mmap, so probing is a binary search over the
+# file's pages and worker processes opening the same book share it through the OS page cache. From the command line:
+#     python XiangqiBook.py games.txt book.bin --plies 30
+#
+# The file is a 16 byte header, "XQBK", the format version and the record count, followed by records of
+#     key    - 64 bit Zobrist key of the position and player to move (Board.get_key)
+#     move   - 16 bit start * 90 + end square index of the move played
+#     weight - games the move was played in
+#     wins   - games the player making the move went on to win
+#     draws  - games that weren't won by either player
+# all little endian, sorted by key then move.
+
+import argparse
+import mmap
+import random
+import struct
+import sys
+
+from XiangqiGame import SQUARES, XiangqiGame
+from XiangqiReplay import read_records, split_record
+
+MAGIC = b"XQBK"
+VERSION = 1
+HEADER = struct.Struct("<4sIQ")
+RECORD = struct.Struct("<QHIII")
+_KEY = struct.Struct("<Q")
+
+
+class Book:
+    """
+    Represents an opening book file opened read only with mmap, with methods to probe a position's moves and to
+    choose a book move.
+    """
+
+    def __init__(self, path):
+        """
+        Constructs a book from a file built by build_book, with private data members of the file, its memory map and
+        the number of records.
+        :param path - book file
+        """
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file can't be mapped
+            self._file.close()
+            raise ValueError(path + " is not an opening book")
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(path + " is not an opening book")
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or len(self._map) != HEADER.size + count * RECORD.size:
+            self.close()
+            raise ValueError(path + " is not an opening book")
+        self._count = count
+
+    def __len__(self):
+        """returns the number of records in the book"""
+        return self._count
+
+    def __enter__(self):
+        """returns the book for use in a with statement"""
+        return self
+
+    def __exit__(self, *exc):
+        """closes the book at the end of a with statement"""
+        self.close()
+
+    def close(self):
+        """unmaps and closes the book file"""
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def _lower_bound(self, key):
+        """
+        returns the index of the first record with a key not less than key
+        :param key - 64 bit position key
+        """
+        data = self._map
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if _KEY.unpack_from(data, HEADER.size + mid * RECORD.size)[0] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def probe(self, key):
+        """
+        returns a list of ((start, end), weight, wins, draws) for every book move of a position, empty if it isn't in
+        the book
+        :param key - 64 bit position key, i.e. Board.get_key()
+        """
+        data = self._map
+        entries = []
+        offset = HEADER.size + self._lower_bound(key) * RECORD.size
+        end = len(data)
+        while offset < end:
+            record_key, move, weight, wins, draws = RECORD.unpack_from(data, offset)
+            if record_key != key:
+                break
+            entries.append((divmod(move, SQUARES), weight, wins, draws))
+            offset += RECORD.size
+        return entries
+
+    def choose(self, board, rng=None, best=False):
+        """
+        returns a book move of a Board's position as (start, end) square indices, picked at random in proportion to
+        how often it was played, or None if the position isn't in the book
+        :param board - Board to find a move for
+        :param rng - random.Random to pick with, or None for the random module
+        :param best - True to always pick the most played move
+        """
+        entries = [entry for entry in self.probe(board.get_key()) if entry[0] in board.moves()]
+        if not entries:
+            return None
+        if best:
+            return max(entries, key=lambda entry: (entry[1], entry[2]))[0]
+        return (rng or random).choices([entry[0] for entry in entries], [entry[1] for entry in entries])[0]
+
+
+def build_book(games, path, plies=30, min_weight=1):
+    """
+    replays games and writes the moves of their first plies as a book file, returns the number of records written;
+    games stop counting at their first move that isn't valid or is malformed
+    :param games - iterable of move lists or (fen, moves) records, read lazily, None for a malformed move
+    :param path - book file to write
+    :param plies - moves of each game to add to the book
+    :param min_weight - fewest games a move must be played in to be kept
+    """
+    stats = {}  # (key, move) -> [weight, wins, draws]
+    for record in games:
+        fen, moves = split_record(record)
+        try:
+            game = XiangqiGame(fen)
+        except ValueError:
+            continue  # a starting position that can't be loaded has nothing to book
+        board = game.get_board_object()
+        played = []  # (key, move, player) of each booked move
+        for ply, move in enumerate(moves):
+            key, player = board.get_key(), game.get_current_player()
+            if move is None or not game.make_move(move[0], move[1]):
+                break
+            if ply < plies:
+                history = board.get_history()[-1]
+                played.append((key, history[0] * SQUARES + history[1], player))
+        state = game.get_game_state()
+        for key, move, player in played:
+            entry = stats.get((key, move))
+            if entry is None:
+                entry = stats[(key, move)] = [0, 0, 0]
+            entry[0] += 1
+            if state == player + "_WON":
+                entry[1] += 1
+            elif state == "UNFINISHED":
+                entry[2] += 1
+    records = sorted((key, move) for (key, move), entry in stats.items() if entry[0] >= min_weight)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for key, move in records:
+            file.write(RECORD.pack(key, move, *stats[(key, move)]))
+    return len(records)
+
+
+def main(argv=None):
+    """
+    builds a book from a game record file from the command line
+    :param argv - command line arguments, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Build a Xiangqi opening book from a game record file")
+    parser.add_argument("games", help="game record file, one game per line")
+    parser.add_argument("book", help="book file to write")
+    parser.add_argument("--plies", type=int, default=30, help="moves of each game to add to the book")
+    parser.add_argument("--min-weight", type=int, default=1, help="fewest games a move must be played in")
+    args = parser.parse_args(argv)
+    count = build_book(read_records(args.games), args.book, args.plies, args.min_weight)
+    print(str(count) + " book moves written to " + args.book, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
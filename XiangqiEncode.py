@@ -0,0 +1,162 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: Batch encoding of Xiangqi positions into NumPy arrays for training evaluation networks. Games are
+# replayed on a Board and each position's bytearray of piece codes is copied straight into a batch buffer, so no Piece
+# or other Python object is made per square. A batch is a dictionary of
+#     "planes" - (N, 14, 10, 9) one plane per piece type and player, red's seven then black's seven, row 0 is rank 10
+#     "side"   - (N,) 0 when red is to move, 1 when black is
+#     "legal"  - (N, 90, 90) True at [start, end] for every legal move, squares indexed by row * 9 + column
+# i.e.
+#     for batch in encode_games(read_records("games.txt"), batch_size=4096):
+#         train(batch["planes"], batch["side"], batch["legal"])
+
+import numpy as np
+
+from XiangqiGame import BLACK_PIECE, COLUMNS, PLAYER_INDEX, ROWS, SQUARES, SQUARE_INDEX, Board
+from XiangqiReplay import split_record
+
+PLANES = 14
+# piece code shown on each plane
+PLANE_CODES = tuple(kind | color for color in (0, BLACK_PIECE) for kind in range(1, 8))
+_PLANE_CODES = np.array(PLANE_CODES, dtype=np.uint8).reshape(1, PLANES, 1)
+
+
+def encode_planes(codes, dtype=np.float32):
+    """
+    returns the (N, 14, 10, 9) piece planes of a batch of positions
+    :param codes - (N, 90) array of piece codes, one row per position
+    :param dtype - type of the planes, i.e. np.float32 or np.uint8
+    """
+    codes = np.asarray(codes, dtype=np.uint8).reshape(-1, 1, SQUARES)
+    return (codes == _PLANE_CODES).reshape(-1, PLANES, ROWS, COLUMNS).astype(dtype)
+
+
+def _square(location):
+    """
+    returns the square index of a move's coordinate, raises ValueError for a malformed coordinate
+    :param location - algebraic coordinate, i.e. "e3", or square index
+    """
+    if isinstance(location, int):
+        return location
+    if location not in SQUARE_INDEX:
+        raise ValueError("malformed move in game record")
+    return SQUARE_INDEX[location]
+
+
+def game_positions(moves, board=None):
+    """
+    yields (piece codes, side to move, legal moves) for every position of a game, from the start through the position
+    after the last move; the piece codes are a bytes copy and the legal moves a tuple of (start, end) square indices,
+    raises ValueError at a malformed or illegal move
+    :param moves - list of (from, to) moves as algebraic coordinates or square indices
+    :param board - Board to replay on, or None for a new Board at the opening position
+    """
+    board = board or Board()
+    for move in moves:
+        if move is None:
+            raise ValueError("malformed move in game record")
+        move_from, move_to = move
+        legal = board.moves()
+        yield bytes(board.get_squares()), PLAYER_INDEX[board.get_turn()], legal
+        start, end = _square(move_from), _square(move_to)
+        if (start, end) not in legal:
+            raise ValueError("move " + str(move_from) + str(move_to) + " is not legal")
+        board.make_move(start, end)
+    yield bytes(board.get_squares()), PLAYER_INDEX[board.get_turn()], board.moves()
+
+
+class _Batch:
+    """
+    Represents the buffers for a batch of positions being filled, with methods to add a position and to build the
+    NumPy arrays.
+    """
+
+    def __init__(self, size, legal):
+        """
+        Constructs a batch with a buffer of piece codes, sides to move and the flat indices of legal moves.
+        :param size - most positions in the batch
+        :param legal - True to collect the legal move masks
+        """
+        self._size = size
+        self._codes = bytearray(size * SQUARES)
+        self._sides = bytearray(size)
+        self._legal = legal
+        self._rows = []  # position of each legal move
+        self._moves = []  # start * 90 + end of each legal move
+        self._count = 0
+
+    def add(self, codes, side, moves):
+        """
+        adds a position to the batch, returns True once the batch is full
+        :param codes - 90 piece codes
+        :param side - 0 for red to move, 1 for black
+        :param moves - tuple of legal (start, end) square indices
+        """
+        count = self._count
+        self._codes[count * SQUARES:(count + 1) * SQUARES] = codes
+        self._sides[count] = side
+        if self._legal:
+            self._rows.extend([count] * len(moves))
+            self._moves.extend([start * SQUARES + end for start, end in moves])
+        self._count = count + 1
+        return self._count == self._size
+
+    def __len__(self):
+        """returns the number of positions in the batch"""
+        return self._count
+
+    def arrays(self, dtype):
+        """
+        returns the batch as a dictionary of NumPy arrays
+        :param dtype - type of the piece planes
+        """
+        count = self._count
+        codes = np.frombuffer(self._codes, dtype=np.uint8, count=count * SQUARES).reshape(count, SQUARES)
+        batch = {"planes": encode_planes(codes, dtype),
+                 "side": np.frombuffer(self._sides, dtype=np.uint8, count=count).copy()}
+        if self._legal:
+            legal = np.zeros((count, SQUARES * SQUARES), dtype=bool)
+            legal[np.array(self._rows, dtype=np.intp), np.array(self._moves, dtype=np.intp)] = True
+            batch["legal"] = legal.reshape(count, SQUARES, SQUARES)
+        return batch
+
+
+def encode_games(games, batch_size=4096, legal=True, dtype=np.float32, skipped=None):
+    """
+    yields batches of encoded positions from replaying games, every batch but the last holding batch_size positions;
+    each game is replayed in full before its positions are added, so one with a malformed FEN or a malformed or illegal
+    move is skipped whole
+    :param games - iterable of move lists or (fen, moves) records, read lazily
+    :param batch_size - positions in each batch
+    :param legal - True to include the legal move masks
+    :param dtype - type of the piece planes
+    :param skipped - function called with the index of each game skipped and its ValueError, or None
+    """
+    batch = _Batch(batch_size, legal)
+    for index, game in enumerate(games):
+        fen, moves = split_record(game)
+        try:
+            positions = list(game_positions(moves, None if fen is None else Board(fen=fen)))
+        except ValueError as error:
+            if skipped is not None:
+                skipped(index, error)
+            continue
+        for codes, side, moves_now in positions:
+            if batch.add(codes, side, moves_now):
+                yield batch.arrays(dtype)
+                batch = _Batch(batch_size, legal)
+    if len(batch):
+        yield batch.arrays(dtype)
+
+
+def encode_boards(boards, legal=True, dtype=np.float32):
+    """
+    returns one batch encoding the current position of each Board
+    :param boards - list of Board objects
+    :param legal - True to include the legal move masks
+    :param dtype - type of the piece planes
+    """
+    batch = _Batch(max(1, len(boards)), legal)
+    for board in boards:
+        batch.add(board.get_squares(), PLAYER_INDEX[board.get_turn()], board.moves() if legal else ())
+    return batch.arrays(dtype)
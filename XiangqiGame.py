@@ -6,41 +6,325 @@
 # The .get_game_state() method returns the state of the game, either "UNFINISHED", "RED_WON" or "BLACK_WON". Moves are
 # performed by using algebraic notation i.e. "a1", "b1".
 
+import random
+import sys
+from array import array
+
+# Move tables
+# Squares are numbered row * 9 + column, the same [row, column] layout as the game board list, so row 0 is black's
+# back rank ("10") and row 9 is red's back rank ("1"). The tables below are built once at import time so that move
+# checking is a lookup instead of a step by step walk across the board.
+ROWS = 10
+COLUMNS = 9
+SQUARES = ROWS * COLUMNS
+
+# Piece codes
+# A piece is stored on the board as a small integer, its type in the low three bits plus BLACK_PIECE for black, so
+# code >> 3 is the player's index in PLAYERS and code & 7 is the piece type. 0 is an empty space.
+EMPTY = 0
+GENERAL = 1
+ADVISOR = 2
+ELEPHANT = 3
+HORSE = 4
+CHARIOT = 5
+CANNON = 6
+SOLDIER = 7
+BLACK_PIECE = 8
+PLAYERS = ("RED", "BLACK")
+PLAYER_INDEX = {"RED": 0, "BLACK": 1}
+PIECE_CODES = " GAEHRCS"  # piece type letter used by Piece.get_code()
+FEN_LETTERS = " KABNRCP kabnrcp"  # FEN letter of each piece code, red upper case
+FEN_CODES = dict({letter: code for code, letter in enumerate(FEN_LETTERS) if letter != " "},
+                 H=HORSE, E=ELEPHANT, h=HORSE | BLACK_PIECE, e=ELEPHANT | BLACK_PIECE)
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+PIECE_NAMES = tuple("  " if not code & 7 else PLAYERS[code >> 3][0] + PIECE_CODES[code & 7] for code in range(16))
+
+
+def _on_board(row, col):
+    """returns True if [row, col] is a location on the board"""
+    return 0 <= row < ROWS and 0 <= col < COLUMNS
+
+
+def _in_castle(row, col):
+    """returns True if [row, col] is inside either player's castle"""
+    return 3 <= col <= 5 and (0 <= row <= 2 or 7 <= row <= 9)
+
+
+def _same_side(row1, row2):
+    """returns True if both rows are on the same side of the river"""
+    return (row1 <= 4) == (row2 <= 4)
+
+
+def parse_fen(fen):
+    """
+    parses a position in Xiangqi FEN, i.e. the opening is
+    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+    and returns its 90 piece codes, player to move, moves since the last capture and full move number
+    red pieces are upper case, black lower case, and "h"/"e" are accepted for horse and elephant as well as "n"/"b"
+    :param fen - position in FEN
+    """
+    fields = fen.split()
+    if not fields:
+        raise ValueError("empty FEN")
+    rows = fields[0].split("/")
+    if len(rows) != ROWS:
+        raise ValueError("FEN needs 10 rows: " + fen)
+    squares = bytearray()
+    for row in rows:
+        start = len(squares)
+        for char in row:
+            if char.isdigit():
+                squares.extend(bytes(int(char)))
+            elif char in FEN_CODES:
+                squares.append(FEN_CODES[char])
+            else:
+                raise ValueError("unknown FEN piece " + repr(char))
+        if len(squares) - start != COLUMNS:
+            raise ValueError("FEN row needs 9 columns: " + row)
+    side = fields[1].lower() if len(fields) > 1 else "w"
+    if side not in ("w", "r", "b"):
+        raise ValueError("unknown FEN side to move " + repr(fields[1]))
+    # fields 2 and 3 are always "-" in Xiangqi, then the moves since capture clock and full move number
+    clock = int(fields[4]) if len(fields) > 4 else 0
+    move_number = int(fields[5]) if len(fields) > 5 else 1
+    return squares, "BLACK" if side == "b" else "RED", clock, move_number
+
+
+_START_SQUARES = bytes(parse_fen(START_FEN)[0])
+
+
+def _build_move_tables():
+    """
+    builds the per-square move tables for every piece type
+    returns general, advisor, elephant, horse, soldier (indexed by player), ray and between tables
+    """
+    ortho = ((-1, 0), (1, 0), (0, -1), (0, 1))
+    diag = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+    general, advisor, elephant, horse, rays = [], [], [], [], []
+    soldier = ([], [])
+    between = [[None] * SQUARES for _ in range(SQUARES)]
+    for sq in range(SQUARES):
+        row, col = divmod(sq, COLUMNS)
+        # general and advisor stay inside their own castle
+        general.append(tuple((row + dr) * COLUMNS + col + dc for dr, dc in ortho
+                             if _in_castle(row, col) and _in_castle(row + dr, col + dc)))
+        advisor.append(tuple((row + dr) * COLUMNS + col + dc for dr, dc in diag
+                             if _in_castle(row, col) and _in_castle(row + dr, col + dc)))
+        # elephant moves two diagonals without crossing the river, the "eye" in between must be empty
+        elephant.append(tuple(((row + 2 * dr) * COLUMNS + col + 2 * dc, (row + dr) * COLUMNS + col + dc)
+                              for dr, dc in diag
+                              if _on_board(row + 2 * dr, col + 2 * dc) and _same_side(row, row + 2 * dr)))
+        # horse moves one orthogonal "leg" then one diagonal outward, the leg must be empty
+        moves = []
+        for dr, dc in ortho:
+            for side in (-1, 1):
+                to_row = row + 2 * dr + (side if dr == 0 else 0)
+                to_col = col + 2 * dc + (side if dc == 0 else 0)
+                if _on_board(to_row, to_col):
+                    moves.append((to_row * COLUMNS + to_col, (row + dr) * COLUMNS + col + dc))
+        horse.append(tuple(moves))
+        # soldiers only move forward until they cross the river, then forward or sideways
+        for player, forward in ((0, -1), (1, 1)):
+            crossed = row <= 4 if player == 0 else row >= 5
+            steps = [(forward, 0)] + ([(0, -1), (0, 1)] if crossed else [])
+            soldier[player].append(tuple((row + dr) * COLUMNS + col + dc for dr, dc in steps
+                                         if _on_board(row + dr, col + dc)))
+        # chariot and cannon rays, ordered outward from the square
+        square_rays = []
+        for dr, dc in ortho:
+            ray = []
+            r, c = row + dr, col + dc
+            while _on_board(r, c):
+                ray.append(r * COLUMNS + c)
+                r, c = r + dr, c + dc
+            for index, to in enumerate(ray):
+                between[sq][to] = tuple(ray[:index])
+            square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return (tuple(general), tuple(advisor), tuple(elephant), tuple(horse),
+            tuple(tuple(moves) for moves in soldier), tuple(rays),
+            tuple(tuple(row) for row in between))
+
+
+def render_squares(squares):
+    """
+    returns the text of a board as Board.print_board prints it, a row of piece names per rank between column labels
+    :param squares - 90 piece codes
+    """
+    lines = [_COLUMN_LABELS]
+    for row in range(ROWS):
+        names = [PIECE_NAMES[code] for code in squares[row * COLUMNS:(row + 1) * COLUMNS]]
+        lines.append(str(ROWS - row) + (" " if row == 0 else "  ") + str(names))
+    lines.append(_COLUMN_LABELS)
+    return "\n".join(lines)
+
+
+_COLUMN_LABELS = " ".join(("     a", "    b ", "   c", "    d", "    e"  "     f", "    g", "    h", "    i"))
+
+
+def square_name(location):
+    """returns the algebraic coordinate i.e. "a10" of a [row, column] location"""
+    return "abcdefghi"[location[1]] + str(ROWS - location[0])
+
+
+# algebraic coordinate of every square index, and the square index of every algebraic coordinate
+SQUARE_NAMES = tuple(square_name(divmod(sq, COLUMNS)) for sq in range(SQUARES))
+SQUARE_INDEX = {name: sq for sq, name in enumerate(SQUARE_NAMES)}
+
+
+# _BETWEEN[a][b] is the tuple of squares strictly between two squares on the same row or column, None otherwise
+_GENERAL_MOVES, _ADVISOR_MOVES, _ELEPHANT_MOVES, _HORSE_MOVES, _SOLDIER_MOVES, _RAYS, _BETWEEN = _build_move_tables()
+
+
+def _build_attack_tables():
+    """
+    builds the reverse tables for pieces whose moves are not symmetric, used to look outward from an attacked square
+    returns horse attackers as (horse square, leg square) pairs and soldier attackers indexed by player
+    """
+    horse = [[] for _ in range(SQUARES)]
+    soldier = ([[] for _ in range(SQUARES)], [[] for _ in range(SQUARES)])
+    for sq in range(SQUARES):
+        for to, leg in _HORSE_MOVES[sq]:
+            horse[to].append((sq, leg))
+        for player in (0, 1):
+            for to in _SOLDIER_MOVES[player][sq]:
+                soldier[player][to].append(sq)
+    return (tuple(tuple(attackers) for attackers in horse),
+            tuple(tuple(tuple(attackers) for attackers in squares) for squares in soldier))
+
+
+_HORSE_ATTACKERS, _SOLDIER_ATTACKERS = _build_attack_tables()
+# _RAY_DIRECTION[a][b] is the index in _RAYS[a] of the ray through square b, NO_RAY if they aren't on a row or column
+NO_RAY = 255
+_RAY_DIRECTION = tuple(bytes(next((direction for direction, ray in enumerate(_RAYS[sq]) if to in ray), NO_RAY)
+                             for to in range(SQUARES)) for sq in range(SQUARES))
+
+
+def _build_zobrist_keys():
+    """
+    builds the random 64 bit Zobrist keys, one per piece code and square plus one for black to move
+    a fixed seed keeps the keys, and so every position's hash, the same in every process
+    """
+    rng = random.Random(0x5851)
+    keys = tuple(tuple(rng.getrandbits(64) if code & 7 else 0 for _ in range(SQUARES)) for code in range(16))
+    return keys, rng.getrandbits(64)
+
+
+_ZOBRIST, _ZOBRIST_BLACK = _build_zobrist_keys()
+
+# A move on the move stack is two 64 bit entries, the Zobrist key before the move and the move packed into bits
+#     0-6 start, 7-13 end, 14-17 captured piece code, 18 player to move, 19-34 clock, 35-63 move number
+# of the position before the move, instead of a tuple of Python ints per move.
+_CLOCK_LIMIT = 1 << 16
+_TURN_BYTES = (b"\0", b"\1")  # last byte of a position snapshot
+_CHECK_BYTES = (b"\0", b"\1")  # last byte of a Board cache entry
+_BYTES_SIZE = sys.getsizeof(b"")  # memory taken by a bytes object besides its contents
+_MOVE_NUMBER_LIMIT = 1 << 29
+
+
+def _unpack_move(packed, key):
+    """
+    returns a packed move stack entry as a (start, end, captured, key, turn, clock, number) record
+    :param packed - packed move
+    :param key - Zobrist key before the move
+    """
+    return (packed & 127, packed >> 7 & 127, packed >> 14 & 15, key, packed >> 18 & 1, packed >> 19 & 0xFFFF,
+            packed >> 35)
+
 
 class XiangqiGame:
     """
     Represents a Xiangqi game object with methods to get the game board, print the game board, get the general
     coordinates, get the game state, get current player, switch player's turn, make a move, and return if a player is in
     check.
+
+    An idle game holds about 700 bytes, about 125 of them the position snapshot, plus about 18 bytes for every move
+    made (CPython 3.11, measured with XiangqiBench.bench_memory). The snapshot is rebuilt by every move rather than on
+    demand so other threads never see a half made move. The pieces get_board returns are shared by every game rather
+    than made per game.
     """
 
-    def __init__(self):
+    __slots__ = ("_backend", "_board", "_game_state", "_current_player", "_red_check", "_black_check", "_searcher",
+                 "_parallel", "_snapshot", "_stats")
+
+    def __init__(self, fen=None, backend=None):
         """
         Constructs a Xiangqi game object with private data members of a game board, state of the game, the current
-        player, red player check status, black player check status, and a coordinate dictionary.
+        player, red player check status, black player check status, a move searcher and a parallel searcher made on
+        first use, a snapshot of the position and call stats made when XiangqiStats is enabled.
+        :param fen - position to start from in FEN, or None for the opening position
+        :param backend - Board class to play on, i.e. XiangqiBitboard.BitBoard, or None for Board
         """
-        self._board = Board()
+        self._backend = backend or Board
+        self._board = self._backend()
         self._game_state = "UNFINISHED"
         self._current_player = "RED"
         self._red_check = False
         self._black_check = False
-        self._coord = \
-            {"1": 9, "2": 8, "3": 7, "4": 6, "5": 5, "6": 4, "7": 3, "8": 2, "9": 1, "10": 0,
-             "a": 0, "b": 1, "c": 2, "d": 3, "e": 4, "f": 5, "g": 6, "h": 7, "i": 8
-             }  # used to convert string coordinates to list coordinates
+        self._searcher = None
+        self._parallel = None
+        self._snapshot = self._board.snapshot()
+        self._stats = None
+        if fen is not None:
+            self.load_fen(fen)
+
+    def load_fen(self, fen):
+        """
+        sets up the game from a position in Xiangqi FEN without replaying any moves, the check status and game state
+        are worked out for the position
+        :param fen - position in FEN, i.e. "4k4/9/9/9/9/9/9/9/4A4/3AK4 w - - 0 1"
+        """
+        board = self._backend(fen=fen)
+        self._board = board
+        self._searcher = None
+        self._current_player = board.get_turn()
+        in_check = board.in_check()
+        # the player who just moved can't legally be in check, but report what the position holds
+        other_check = board.gen_check(self._current_player) == self._current_player
+        if self._current_player == "RED":
+            self._red_check, self._black_check = in_check, other_check
+        else:
+            self._red_check, self._black_check = other_check, in_check
+        self._game_state = "UNFINISHED"
+        if not board.has_legal_move(self._current_player, in_check):
+            self._game_state = "BLACK_WON" if self._current_player == "RED" else "RED_WON"
+        self._snapshot = board.snapshot()
+
+    def get_fen(self):
+        """returns the game's position in Xiangqi FEN"""
+        return self._board.get_fen()
+
+    def snapshot(self):
+        """
+        returns the Board.snapshot of the position after the last move made, kept up to date by make_move so other
+        threads can read it while a move is being made
+        """
+        return self._snapshot
 
     def get_board(self):
         """returns the board data member's Board"""
         return self._board.get_board()
 
+    def get_board_object(self):
+        """returns the Board the game is played on, for code working on square indices; moves go through make_move"""
+        return self._board
+
     def print_board(self):
         """prints the board data member's Board"""
         return self._board.print_board()
 
+    def render(self):
+        """returns the board data member's Board as the text print_board prints"""
+        return self._board.render()
+
     def get_general_coords(self):
         """returns the board data member's general coordinates"""
         return self._board.general_location()
 
+    def get_stats(self):
+        """returns the game's call counts and times recorded while XiangqiStats is enabled, see XiangqiStats.Stats"""
+        return {} if self._stats is None else self._stats.get_stats()
+
     def get_game_state(self):
         """returns the game's state"""
         return self._game_state
@@ -56,88 +340,192 @@ class XiangqiGame:
         elif self._current_player == "BLACK":
             self._current_player = "RED"
 
-    def make_move(self, move_from, move_to):
+    def _convert_coord(self, coord):
+        """
+        converts an algebraic coordinate i.e. "a10" to a [row, column] list, returns None if not valid
+        :param coord - coordinate to convert
+        """
+        sq = SQUARE_INDEX.get(coord)
+        if sq is None:
+            return None
+        return [sq // COLUMNS, sq % COLUMNS]
+
+    def legal_moves(self):
+        """yields every legal move for the current player as a pair of algebraic coordinates i.e. ("a1", "a2")"""
+        if self._game_state != "UNFINISHED":
+            return
+        for move_from, move_to in self._board.legal_moves(self._current_player):
+            yield SQUARE_NAMES[move_from[0] * COLUMNS + move_from[1]], SQUARE_NAMES[move_to[0] * COLUMNS + move_to[1]]
+
+    def legal_targets(self, square):
+        """
+        returns a list of the algebraic coordinates the piece on square can legally move to
+        :param square - coordinate of the piece i.e. "a1"
+        """
+        location = self._convert_coord(square)
+        if self._game_state != "UNFINISHED" or location is None:
+            return []
+        return [square_name(move_to) for move_to in self._board.legal_targets(location, self._current_player)]
+
+    def best_move(self, time_ms=1000, depth=None, nodes=None, workers=1, tablebases=None):
+        """
+        searches for the current player's best move and returns it as a pair of algebraic coordinates, or None if the
+        game is over; the search stops when the first of its time, depth or node budgets runs out
+        :param time_ms - time budget in milliseconds, or None for no limit
+        :param depth - deepest search depth, or None for no limit
+        :param nodes - node budget, or None for no limit
+        :param workers - number of processes to split the search across, None for one per CPU; the processes are kept
+        for the game's later searches until close is called
+        :param tablebases - XiangqiTablebase.Tablebases to look the position up in before searching, or None
+        """
+        from XiangqiSearch import MAX_PLY, Searcher
+        if self._game_state != "UNFINISHED":
+            return None
+        if tablebases is not None:
+            move = tablebases.best_move(self._board)
+            if move is not None:
+                return SQUARE_NAMES[move[0]], SQUARE_NAMES[move[1]]
+        if workers == 1:
+            if self._searcher is None:
+                self._searcher = Searcher(self._board)
+            result = self._searcher.search(time_ms, depth or MAX_PLY, nodes)
+        else:
+            result = self._parallel_searcher(workers).search(self._board, time_ms, depth or MAX_PLY, nodes)
+        if result["move"] is None:
+            return None
+        start, end = result["move"]
+        return SQUARE_NAMES[start], SQUARE_NAMES[end]
+
+    def _parallel_searcher(self, workers):
+        """
+        returns the game's ParallelSearcher, made on first use and again if the number of workers changes, so its
+        worker processes and their transposition tables last from one search to the next
+        :param workers - number of worker processes, None for one per CPU
+        """
+        from XiangqiSearch import ParallelSearcher
+        searcher = ParallelSearcher(workers)
+        if self._parallel is not None and self._parallel.get_workers() == searcher.get_workers():
+            return self._parallel
+        self.close()
+        self._parallel = searcher
+        return searcher
+
+    def close(self):
+        """shuts down the worker processes of the game's parallel searches, if any were started"""
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+
+    def book_move(self, book, rng=None, best=False):
+        """
+        returns a move for the current player from an opening book as a pair of algebraic coordinates, or None if the
+        position isn't in the book or the game is over, without searching
+        :param book - XiangqiBook.Book, or the path of a book file
+        :param rng - random.Random to pick with, or None for the random module
+        :param best - True to always pick the most played move
+        """
+        from XiangqiBook import Book
+        if self._game_state != "UNFINISHED":
+            return None
+        if isinstance(book, Book):
+            move = book.choose(self._board, rng, best)
+        else:
+            with Book(book) as opened:
+                move = opened.choose(self._board, rng, best)
+        if move is None:
+            return None
+        return SQUARE_NAMES[move[0]], SQUARE_NAMES[move[1]]
+
+    def export_record(self):
+        """returns the game's moves from its starting position as a XiangqiArchive game record"""
+        from XiangqiArchive import encode_game
+        board = self._board
+        fen = board.get_start_fen()
+        return encode_game([record[:2] for record in board.get_history()], None if fen == START_FEN else fen)
+
+    def load_record(self, record):
+        """
+        sets up the game from a XiangqiArchive game record, loading its starting position and replaying its moves up to
+        the first one that isn't valid, returns how many were made, raises ValueError if the bytes aren't a game record
+        :param record - game record bytes, i.e. XiangqiArchive.Archive()[index]
+        """
+        from XiangqiArchive import decode_game
+        fen, moves = decode_game(record)
+        self.load_fen(fen or START_FEN)
+        made = 0
+        for start, end in moves:
+            if not self._play(start, end):
+                break
+            made += 1
+        return made
+
+    def make_move(self, move_from, move_to=None):
         """
         checks if a move is valid for the game board, returns True if valid, False if not
-        :param move_from - coordinate of piece to move
+        coordinates can be algebraic i.e. "a1", or square indices (row * 9 + column) to skip parsing, and a move can be
+        passed as one (move_from, move_to) tuple; arguments of any other type are not valid moves
+        :param move_from - coordinate of piece to move, or a (move_from, move_to) tuple
         :param move_to - coordinate of where piece is to move
         """
-        if self._game_state != "UNFINISHED":
-            return False
-        # convert string coordinates to list
-        move_from = list(move_from)
-        move_to = list(move_to)
-        if len(move_from) < 3 and "0" in move_from:
+        if type(move_from) is int and type(move_to) is int:  # square indices, i.e. from Board.moves(), need no parsing
+            return 0 <= move_from < SQUARES and 0 <= move_to < SQUARES and self._play(move_from, move_to)
+        if move_to is None:
+            if type(move_from) is not tuple or len(move_from) != 2:
+                return False
+            move_from, move_to = move_from
+        # convert string coordinates to square indices
+        start = move_from if type(move_from) is int else SQUARE_INDEX.get(move_from) if type(move_from) is str else None
+        end = move_to if type(move_to) is int else SQUARE_INDEX.get(move_to) if type(move_to) is str else None
+        if start is None or end is None:
             return False
-        if len(move_to) < 3 and "0" in move_to:
+        return self._play(start, end)
+
+    def make_moves(self, moves):
+        """
+        makes a list of moves in order, stopping at the first one that isn't valid, returns how many were made
+        :param moves - iterable of (move_from, move_to) pairs in any form make_move accepts
+        """
+        made = 0
+        for move_from, move_to in moves:
+            if not self.make_move(move_from, move_to):
+                break
+            made += 1
+        return made
+
+    def _play(self, start, end):
+        """
+        makes a move for the current player if it is valid, updating check status, game state and the turn, returns
+        True if valid, False if not
+        :param start - square index of the piece to move
+        :param end - square index of where the piece is to move
+        """
+        if self._game_state != "UNFINISHED":
             return False
-        # check if move_from coordinate contains a "1","0" and converts it to "10"
-        if "0" in move_from:
-            join = str(move_from[1] + move_from[2])
-            move_from.remove("0")
-            move_from.remove("1")
-            move_from.append(join)
-        # check if move_to coordinate contains a "1","0" and converts it to "10"
-        if "0" in move_to:
-            join = str(move_to[1] + move_to[2])
-            move_to.remove("0")
-            move_to.remove("1")
-            move_to.append(join)
-        # reverse the coordinates to function with game board list/array
-        move_from.reverse()
-        move_to.reverse()
-        # convert list of string coordinates to integers using dictionary data member
-        index = 0
-        for i in move_from:
-            if i in self._coord.keys():
-                move_from[index] = self._coord.get(i)
-                index += 1
-        index = 0
-        for i in move_to:
-            if i in self._coord.keys():
-                move_to[index] = self._coord.get(i)
-                index += 1
-        # check if coordinates are not valid i.e. "11", "22", etc.
-        for num in move_from:
-            if type(num) == str:
-                return False
-        for num in move_to:
-            if type(num) == str:
-                return False
-        # attempt to make a move on the game board
-        move = self._board.check_move(move_from, move_to, "NORMAL", self._current_player)
-        if move:
-            # check if black player is in check after move
-            black_in_check = self._board.gen_check("RED")
-            if black_in_check == "RED":  # black general found to be in check
-                if self._current_player == "RED":  # player was red = black general now in check status
-                    self._black_check = True
-                elif self._current_player == "BLACK":  # player was black, clear invalid move
-                    return self._board.clear_move(move_from, move_to)
-            elif black_in_check == "NONE":  # if black player not in check, black now not in check status
-                self._black_check = False
-
-            # check if red player is in check after move
-            red_in_check = self._board.gen_check("BLACK")
-            if red_in_check == "BLACK":  # red general found to be in check
-                if self._current_player == "BLACK":  # player was black = red general now in check status
-                    self._red_check = True
-                elif self._current_player == "RED":  # player was red, clear invalid move
-                    return self._board.clear_move(move_from, move_to)
-            elif black_in_check == "NONE":  # if red player not in check, red now not in check status
-                self._red_check = False
-
-            # check for stalemate or checkmate
-            stale = self._board.stalemate()
-            if stale == "RED":  # RED player has no valid moves to not put general in check
-                self._game_state = "BLACK_WON"
-            elif stale == "BLACK":  # BLACK player has no valid moves to not put general in check
+        # attempt to make a move on the game board, a move that leaves the player's own general in check is not valid
+        board = self._board
+        player = self._current_player
+        if not board.is_legal_move(start, end, player):
+            return False  # return False if move not valid
+        board.make_move(start, end)
+        # check if the opponent's general is in check after move, the player's general can't be
+        opponent_check = board.in_check()
+        if player == "RED":
+            self._red_check = False
+            self._black_check = opponent_check
+        else:
+            self._black_check = False
+            self._red_check = opponent_check
+
+        # check for stalemate or checkmate, only the player moving next can be left without a valid move
+        if not board.has_legal_move(board.get_turn(), opponent_check):
+            if player == "RED":
                 self._game_state = "RED_WON"
+            else:
+                self._game_state = "BLACK_WON"
 
-            self.set_current_player()  # change turn to next player
-            return move  # return true if move valid
-        else:
-            return False  # return False if move not valid
+        self.set_current_player()  # change turn to next player
+        self._snapshot = board.snapshot()
+        return True  # return true if move valid
 
     def is_in_check(self, player):
         """
@@ -155,88 +543,133 @@ class Board:
     Represents a Xiangqi game board with methods to retrieve the board, get the general locations, print the board,
     check if a move is valid, check if a player is in check, and check for stalemate or checkmate.
 
+    The board is stored as a flat bytearray of 90 piece codes indexed by row * 9 + column, 0 for an empty space.
     """
 
-    def __init__(self):
-        """
-        Constructs a Xiangqi Board object with private data members of all game pieces, a board, general location
-        coordinates, and a temporary piece holder.
-        """
-        self._G1 = General("RED")
-        self._G2 = General("BLACK")
-        self._A1 = Advisor("RED")
-        self._A2 = Advisor("RED")
-        self._A3 = Advisor("BLACK")
-        self._A4 = Advisor("BLACK")
-        self._E1 = Elephant("RED")
-        self._E2 = Elephant("RED")
-        self._E3 = Elephant("BLACK")
-        self._E4 = Elephant("BLACK")
-        self._H1 = Horse("RED")
-        self._H2 = Horse("RED")
-        self._H3 = Horse("BLACK")
-        self._H4 = Horse("BLACK")
-        self._R1 = Chariot("RED")
-        self._R2 = Chariot("RED")
-        self._R3 = Chariot("BLACK")
-        self._R4 = Chariot("BLACK")
-        self._C1 = Cannon("RED")
-        self._C2 = Cannon("RED")
-        self._C3 = Cannon("BLACK")
-        self._C4 = Cannon("BLACK")
-        self._S1 = Soldier("RED")
-        self._S2 = Soldier("RED")
-        self._S3 = Soldier("RED")
-        self._S4 = Soldier("RED")
-        self._S5 = Soldier("RED")
-        self._S6 = Soldier("BLACK")
-        self._S7 = Soldier("BLACK")
-        self._S8 = Soldier("BLACK")
-        self._S9 = Soldier("BLACK")
-        self._S10 = Soldier("BLACK")
-        self._general_check = [[0, 4], [9, 4]]  # [0] = black, # [1] = red
-        self._temp = None
-        self._board = \
-            [[self._R3, self._H3, self._E3, self._A3, self._G2, self._A4, self._E4, self._H4, self._R4],
-             ["  ", "  ", "  ", "  ", "  ", "  ", "  ", "  ", "  "],
-             ["  ", self._C3, "  ", "  ", "  ", "  ", "  ", self._C4, "  "],
-             [self._S6, "  ", self._S7, "  ", self._S8, "  ", self._S9, "  ", self._S10],
-             ["  ", "  ", "  ", "  ", "  ", "  ", "  ", "  ", "  "],
-             ["  ", "  ", "  ", "  ", "  ", "  ", "  ", "  ", "  "],
-             [self._S1, "  ", self._S2, "  ", self._S3, "  ", self._S4, "  ", self._S5],
-             ["  ", self._C1, "  ", "  ", "  ", "  ", "  ", self._C2, "  "],
-             ["  ", "  ", "  ", "  ", "  ", "  ", "  ", "  ", "  "],
-             [self._R1, self._H1, self._E1, self._A1, self._G1, self._A2, self._E2, self._H2, self._R2]
-             ]
+    __slots__ = ("_cache", "_attack_map", "_attack_sets", "_dirty", "_squares", "_generals", "_turn", "_history",
+                 "_clock", "_move_number", "_key", "_rendered")
+
+    def __init__(self, cache=None, fen=None):
+        """
+        Constructs a Xiangqi Board object with private data members of a board of piece codes, the square of each
+        player's general, the player to move, a stack of the moves made, the move counters, the position's Zobrist key
+        and an optional transposition table caching legal moves and check status.
+        :param cache - TranspositionTable to cache positions in, or None
+        :param fen - position to start from in FEN, or None for the opening position
+        """
+        self._cache = cache
+        # attack map: how many of each player's pieces attack every square, and the squares each piece attacks
+        # it is built on first read, then brought up to date only from the squares changed since the last read
+        self._attack_map = None
+        self._attack_sets = None
+        self._dirty = None  # None = rebuild the whole map
+        self._rendered = None  # (key, text) of the last render
+        if fen is None:
+            self.set_position(_START_SQUARES)
+        else:
+            self.set_fen(fen)
 
     def get_board(self):
-        """returns the game board"""
-        return self._board
+        """returns the game board as a list of rows holding a Piece or "  " for an empty space"""
+        squares = self._squares
+        return [[_piece_view(squares[sq], sq) for sq in range(row * COLUMNS, (row + 1) * COLUMNS)]
+                for row in range(ROWS)]
+
+    def get_squares(self):
+        """returns the flat bytearray of piece codes"""
+        return self._squares
+
+    def set_position(self, squares, player="RED", clock=0, move_number=1):
+        """
+        replaces the position with 90 piece codes and a player to move, clearing the move stack
+        :param squares - 90 piece codes indexed by row * 9 + column
+        :param player - 'RED' or 'BLACK', the player to move
+        :param clock - moves since the last capture
+        :param move_number - full move number, starting at 1
+        """
+        squares = bytearray(squares)
+        if len(squares) != SQUARES:
+            raise ValueError("a position needs 90 squares")
+        generals = [None, None]
+        for sq, code in enumerate(squares):
+            if code & 7 == GENERAL:
+                generals[code >> 3] = sq
+        if None in generals:
+            raise ValueError("a position needs both generals")
+        if not 0 <= clock < _CLOCK_LIMIT or not 1 <= move_number < _MOVE_NUMBER_LIMIT:
+            raise ValueError("move counters out of range")
+        self._squares = squares
+        self._generals = generals
+        self._turn = PLAYER_INDEX[player]
+        self._history = array("Q")  # packed move, key before the move, for every move made
+        self._clock = clock
+        self._move_number = move_number
+        self._key = self._compute_key()
+        self._dirty = None
+
+    def snapshot(self):
+        """
+        returns the position as an immutable, hashable 91 byte value, the 90 piece codes then 0 if red is to move or 1
+        if black is, so equal positions have equal snapshots; see from_snapshot
+        """
+        return bytes(self._squares) + _TURN_BYTES[self._turn]
+
+    @classmethod
+    def from_snapshot(cls, snapshot, cache=None):
+        """
+        returns a new Board at a snapshot's position with an empty move stack, independent of the board it came from
+        :param snapshot - value returned by snapshot
+        :param cache - TranspositionTable to cache positions in, or None
+        """
+        if len(snapshot) != SQUARES + 1 or snapshot[SQUARES] > 1:
+            raise ValueError("a snapshot needs 90 squares and the player to move")
+        board = cls(cache)
+        board.set_position(snapshot[:SQUARES], PLAYERS[snapshot[SQUARES]])
+        return board
+
+    def set_fen(self, fen):
+        """
+        replaces the position with one in Xiangqi FEN, clearing the move stack
+        :param fen - position in FEN, see parse_fen
+        """
+        self.set_position(*parse_fen(fen))
+
+    def get_fen(self):
+        """returns the position in Xiangqi FEN"""
+        squares = self._squares
+        rows = []
+        for start in range(0, SQUARES, COLUMNS):
+            row = ""
+            empty = 0
+            for code in squares[start:start + COLUMNS]:
+                if code:
+                    if empty:
+                        row += str(empty)
+                        empty = 0
+                    row += FEN_LETTERS[code]
+                else:
+                    empty += 1
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        return "/".join(rows) + (" b" if self._turn else " w") + " - - " + str(self._clock) + " " + \
+            str(self._move_number)
 
     def general_location(self):
         """returns the coordinates for both player's generals"""
-        return self._general_check
+        red, black = self._generals
+        return [list(divmod(black, COLUMNS)), list(divmod(red, COLUMNS))]  # [0] = black, # [1] = red
 
     def print_board(self):
-        """prints the game board"""  # NOTE: this must be used after the LAST turn has taken place
-        print("     a", "    b ", "   c", "    d", "    e"  "     f", "    g", "    h", "    i")
-        i = 10
-        for row in self._board:
-            ecx = 0
-            for piece in row:
-                if piece != "  ":
-                    if piece.get_player() == "RED":
-                        row[ecx] = str("R" + piece.get_code())
-                    else:
-                        row[ecx] = str("B" + piece.get_code())
-                ecx += 1
-            if i == 10:
-                print(i, row)
-                i -= 1
-            else:
-                print(i, "", row)
-                i -= 1
-        print("     a", "    b ", "   c", "    d", "    e"  "     f", "    g", "    h", "    i")
+        """prints the game board"""
+        print(self.render())
+
+    def render(self):
+        """returns the text print_board prints, kept until the position changes"""
+        rendered = self._rendered
+        if rendered is None or rendered[0] != self._key:
+            rendered = self._rendered = (self._key, render_squares(self._squares))
+        return rendered[1]
 
     def check_move(self, move_from, move_to, function, player):
         """
@@ -247,255 +680,84 @@ class Board:
         :param player - 'RED' or 'BLACK'
         """
         # check if coordinates are on the board
-        if (move_from[0] > 9 or move_to[0] > 9) or (move_from[1] > 8 or move_to[1] > 8):
+        if not (_on_board(move_from[0], move_from[1]) and _on_board(move_to[0], move_to[1])):
             return False
-        # check if actual piece is being moved, not a blank space
-        if self._board[move_from[0]][move_from[1]] == "  ":
-            return False
-        # castle coordinates for red and black players
-        castle = [[9, 4], [9, 5], [9, 3], [8, 4], [8, 5], [8, 3], [7, 4], [7, 5], [7, 3]]
-        castle2 = [[0, 4], [0, 5], [0, 3], [1, 4], [1, 5], [1, 3], [2, 4], [2, 5], [2, 3]]
-        piece = self._board[move_from[0]][move_from[1]]  # piece being moved
-        landing = self._board[move_to[0]][move_to[1]]  # piece/space being moved to
-        current = move_from
-        # check if piece being moved belongs to current player
-        if piece.get_player() != player:
+        squares = self._squares
+        start = move_from[0] * COLUMNS + move_from[1]
+        end = move_to[0] * COLUMNS + move_to[1]
+        code = squares[start]  # piece being moved
+        landing = squares[end]  # piece/space being moved to
+        color = PLAYER_INDEX[player]
+        # check if an actual piece of the current player is being moved, not a blank space
+        if not code or code >> 3 != color:
             return False
         # check if location being moved to is not of same color/player
-        if landing != "  ":
-            if landing.get_player() == piece.get_player():
-                return False
-
-        # if piece has diagonal movement and is an elephant/advisor
-        if piece.get_direction() == "DIAG":
-            i = 0  # space counter
-            while i < piece.get_spaces():
-                diag1 = [[current[0] - 1, current[1] - 1], [current[0] - 1, current[1] + 1],
-                         [current[0] + 1, current[1] - 1],
-                         [current[0] + 1, current[1] + 1]
-                         ]  # list of possible diagonal locations
-
-                if piece.get_code() == "E" or piece.get_code() == "A":
-                    # check if elephant is trying to cross the "river"
-                    if piece.get_player() == "RED" and piece.get_code() == "E":
-                        if move_to[0] < 5:
-                            return False
-                    elif piece.get_player() == "BLACK" and piece.get_code() == "E":
-                        if move_to[0] > 4:
-                            return False
-                    # find proper diagonal current of next immediate diagonal space to move
-                    # this is based on its move_to location
-                    if current[0] > move_to[0]:
-                        if current[1] < move_to[1]:
-                            current = diag1[1]
-                        else:
-                            current = diag1[0]
-                    if current[0] < move_to[0]:
-                        if current[1] > move_to[1]:
-                            current = diag1[2]
-                        else:
-                            current = diag1[3]
-                    # check if current spot is in the castle if an advisor
-                    if piece.get_code() == "A" and piece.get_player() == "RED":
-                        if current not in castle:
-                            return False
-                    elif piece.get_code() == "A" and piece.get_player() == "BLACK":
-                        if current not in castle2:
-                            return False
-                    # if current spot is off the board
-                    if current[0] > 9 or current[1] > 8:
-                        return False
-                    # check if elephant for "blinding"
-                    # the adjacent diagonal position of it's current location cannot be occupied
-                    if self._board[current[0]][current[1]] != "  ":
-                        if i == 0 and piece.get_code() == "E":
-                            return False
-                i += 1  # increment counter for next diagonal spot if elephant
-                # check if elephant is trying to move only one diagonal location
-                if piece.get_code() == "E" and current == move_to and i != 2:
-                    return False
-            if current != move_to:
-                return False
-
-        # if the piece to move is a horse
-        if piece.get_code() == "H":
-            otrho1 = [[current[0], current[1] - 1], [current[0], current[1] + 1],
-                      [current[0] - 1, current[1]],
-                      [current[0] + 1, current[1]]
-                      ]  # possible orthogonal movements for horse's first move spot
-
-            # find the initial orthogonal movement based on horse's move_to destination
-            if move_to in otrho1:
-                return False
-            if current[0] > move_to[0] and (move_to[1] == move_from[1] + 1 or move_to[1] == move_from[1] - 1):
-                current = otrho1[2]
-            elif current[1] - 2 == move_to[1]:
-                current = otrho1[0]
-            elif current[1] + 2 == move_to[1]:
-                current = otrho1[1]
-            else:
-                current = otrho1[3]
-            # check if horse orthogonal movement goes off the board
-            if current[0] > 9 or current[1] > 8:
-                return False
-            # check if horse is blocked/"hobbled"
-            if self._board[current[0]][current[1]] != "  ":
-                return False
-            # find the horse's next spot, based on diagonal movement
-            diag1 = [[current[0] - 1, current[1] - 1], [current[0] - 1, current[1] + 1],
-                     [current[0] + 1, current[1] - 1],
-                     [current[0] + 1, current[1] + 1]
-                     ]
-
-            if current[0] > move_to[0]:
-                if current[1] < move_to[1]:
-                    current = diag1[1]
-                else:
-                    current = diag1[0]
-            if current[0] < move_to[0]:
-                if current[1] > move_to[1]:
-                    current = diag1[2]
-                else:
-                    current = diag1[3]
-
-        # if piece to be moved has orthogonal ONLY movement
-        if piece.get_direction() == "ORTHO":
-            cannon_count = 0  # used to check that cannon has a "screen"
-            i = 0
-            while i < piece.get_spaces() and current != move_to:
-                otrho1 = [[current[0], current[1] - 1], [current[0], current[1] + 1],
-                          [current[0] - 1, current[1]],
-                          [current[0] + 1, current[1]]
-                          ]  # possible orthogonal movement spaces
-
-                # if piece is a General check that movement is within castle walls
-                if piece.get_code() == "G":
-                    if piece.get_player() == "RED":
-                        if move_to in castle and move_to in otrho1:
-                            i += 1
-                            if function != "GENCHECK":
-                                self._general_check[1] = move_to  # set new red general location
-                        else:
-                            return False
-
-                    elif move_to in castle2 and move_to in otrho1:  # if black general
-                        i += 1
-                        if function != "GENCHECK":
-                            self._general_check[0] = move_to  # set new black general location
-                    else:
-                        return False
-
-                # move piece to next adjacent orthogonal spot based on move_to
-                if current[0] == move_to[0] and current != move_to:
-                    if current[1] > move_to[1]:
-                        current = otrho1[0]
-                    else:
-                        current = otrho1[1]
-                if current[1] == move_to[1] and current != move_to:
-                    if current[0] > move_to[0]:
-                        current = otrho1[2]
-                    else:
-                        current = otrho1[3]
-                i += 1  # increment move counter
-                # check if current spot is off the board
-                if current[0] > 9 or current[1] > 8:
-                    return False
-                # check if current orthogonal spot is occupied and piece not yet at final destination
-                check = self._board[current[0]][current[1]]
-                if check != "  " and piece.get_code() != "C" and current != move_to:
-                    return False
-                # check for cannon screen
-                if self._board[current[0]][current[1]] != "  ":
-                    if piece.get_code() == "C" and current != move_to:
-                        cannon_count += 1  # increments cannon's "screen" count
-
-            # check for cannon specifics
-            if piece.get_code() == "C":
-                # check if cannon has no screen and is trying to move to occupied spot
-                if cannon_count != 1 and self._board[current[0]][current[1]] != "  ":
-                    return False
-                # check if cannon trying to capture, it has a screen
-                if cannon_count == 1 and landing == "  ":
-                    return False
-
-                if cannon_count > 1:
-                    return False
-
-        # piece is a soldier
-        if piece.get_code() == "S":
-            if piece.get_direction() == "DRY":
-                if piece.get_player() == "RED":
-                    # soldier is RED and "DRY", only move straight
-                    straight = [move_from[0] - 1, move_from[1]]
-                    if straight != move_to:
-                        return False
-                    # if piece is is not crossing the river
-                    if move_to[0] > 4:
-                        current = move_to
-                    elif move_to[0] < 5 and function == "NORMAL":
-                        # if piece is being moved across the river, becomes "WET"
-                        piece.set_direction("WET")
-                        current = move_to
-                    # if checking move for stalemate function, ignore setting the direction
-                    elif move_to[0] < 5 and function == "STALE":
-                        current = move_to
-                else:
-                    # soldier is BLACK and "DRY", only move straight
-                    straight = [move_from[0] + 1, move_from[1]]
-                    if straight != move_to:
-                        return False
-                    if move_to[0] < 5:
-                        current = move_to
-                    elif move_to[0] > 4 and function == "NORMAL":
-                        # if black soldier goes across the river, becomes "WET"
-                        piece.set_direction("WET")
-                        current = move_to
-                    elif move_to[0] > 4 and function == "STALE":
-                        current = move_to
-            # if piece is "WET" and RED
-            elif piece.get_player() == "RED":
-                otrho2 = [[current[0], current[1] - 1], [current[0], current[1] + 1],
-                          [current[0] - 1, current[1]]
-                          ]  # possible orthogonal movements except no backwards
-                if move_to not in otrho2:
-                    return False
-                else:
-                    current = move_to
-            # if piece is "WET" and BLACK
-            elif piece.get_player() == "BLACK":
-                otrho2 = [[current[0], current[1] - 1], [current[0], current[1] + 1],
-                          [current[0] + 1, current[1]]
-                          ]
-                if move_to not in otrho2:
-                    return False
-                else:
-                    current = move_to
-            if current[0] > 9 or current[1] > 8:
-                return False
-        # if any piece's current position is not it's intended destination, return False
-        if current != move_to:
+        if landing and landing >> 3 == color:
+            return False
+        # check the move against the piece's move table
+        if not self._reachable(code, start, end):
             return False
 
         # if using this method with gen_check method, no actual moving of pieces
         if function == "GENCHECK":
             return True
 
-        # moving the piece to its destination and replacing with "  "
-        self._board[move_from[0]][move_from[1]] = "  "
-        self._board[move_to[0]][move_to[1]] = piece
-        # storing a temporary of the piece it landed on/captured
-        # this temporary piece is used for clearing moves in make_move and stalemate if move ends up not being valid
-        self._temp = landing
+        # moving the piece to its destination, the move stack keeps the piece it captured for clear_move
+        self.make_move(start, end)
 
         # check that the General's don't see each other
-        if self._general_check[0][1] == self._general_check[1][1]:
-            column = self._general_check[0][1]
-            i = 0
-            for row in self._board:
-                if row[column] == "  ":
-                    i += 1
-            if i == 8:
-                return self.clear_move(move_from, move_to)
+        if self.generals_facing():
+            return self.clear_move(move_from, move_to)
+        return True
+
+    def _reachable(self, code, start, end):
+        """
+        checks a piece's move from square start to square end against the move tables, ignoring whose turn it is
+        :param code - piece code being moved
+        :param start - square index of the piece
+        :param end - square index of the destination
+        """
+        squares = self._squares
+        kind = code & 7
+        if kind == CHARIOT or kind == CANNON:
+            between = _BETWEEN[start][end]
+            if between is None:  # not on the same row or column
+                return False
+            screens = 0  # pieces between the start and end
+            for sq in between:
+                if squares[sq]:
+                    screens += 1
+            if kind == CHARIOT:
+                return screens == 0
+            # cannon moves like a chariot, but captures by jumping exactly one "screen"
+            if not squares[end]:
+                return screens == 0
+            return screens == 1
+        if kind == HORSE:
+            for to, leg in _HORSE_MOVES[start]:
+                if to == end:  # check if horse is blocked/"hobbled"
+                    return not squares[leg]
+            return False
+        if kind == ELEPHANT:
+            for to, eye in _ELEPHANT_MOVES[start]:
+                if to == end:  # check elephant for "blinding"
+                    return not squares[eye]
+            return False
+        if kind == SOLDIER:
+            return end in _SOLDIER_MOVES[code >> 3][start]
+        if kind == ADVISOR:
+            return end in _ADVISOR_MOVES[start]
+        return end in _GENERAL_MOVES[start]
+
+    def generals_facing(self):
+        """returns True if the two generals are on the same column with no pieces between them"""
+        red, black = self._generals
+        if red % COLUMNS != black % COLUMNS:
+            return False
+        squares = self._squares
+        for sq in _BETWEEN[black][red]:
+            if squares[sq]:
+                return False
         return True
 
     def clear_move(self, move_from, move_to):
@@ -504,125 +766,773 @@ class Board:
         :param move_from - piece's original location
         :param move_to - piece's current location
         """
-        piece = self._board[move_to[0]][move_to[1]]
-        # check if General being reset, if so, reset general location data member
-        if piece.get_code() == "G":
-            if piece.get_player() == "RED":
-                self._general_check[1] = move_from
-            elif piece.get_player() == "BLACK":
-                self._general_check[0] = move_from
-        # move piece to it's original location and restore piece/spot it took
-        self._board[move_from[0]][move_from[1]] = piece
-        self._board[move_to[0]][move_to[1]] = self._temp
+        history = self._history
+        if history and history[-2] & 127 == move_from[0] * COLUMNS + move_from[1] and \
+                history[-2] >> 7 & 127 == move_to[0] * COLUMNS + move_to[1]:
+            self.unmake_move()
         return False
 
+    def make_move(self, start, end):
+        """
+        moves a piece without checking the move and pushes it on the move stack, returns the captured piece code
+        :param start - square index of the piece
+        :param end - square index of the destination
+        """
+        squares = self._squares
+        code = squares[start]
+        captured = squares[end]
+        history = self._history
+        history.append(start | end << 7 | captured << 14 | self._turn << 18 | self._clock << 19 |
+                       self._move_number << 35)
+        history.append(self._key)
+        squares[start] = EMPTY
+        squares[end] = code
+        if code & 7 == GENERAL:
+            self._generals[code >> 3] = end  # set new general location
+        turn = (code >> 3) ^ 1
+        keys = _ZOBRIST[code]
+        key = self._key ^ keys[start] ^ keys[end] ^ _ZOBRIST[captured][end]
+        if turn != self._turn:
+            key ^= _ZOBRIST_BLACK
+        self._key = key
+        self._turn = turn
+        self._clock = 0 if captured else self._clock + 1
+        if code >> 3:
+            self._move_number += 1
+        self._touch(start, end)
+        return captured
+
+    def unmake_move(self):
+        """
+        takes back the last move on the move stack, restoring any captured piece, the Zobrist key, the player to move
+        and the move counters, returns the (start, end, captured, key, turn, clock, number) record of the move
+        a soldier's river crossing comes from its square, so it needs no restoring
+        """
+        history = self._history
+        self._key = key = history.pop()
+        packed = history.pop()
+        start, end, captured = packed & 127, packed >> 7 & 127, packed >> 14 & 15
+        self._turn = turn = packed >> 18 & 1
+        self._clock = clock = packed >> 19 & 0xFFFF
+        self._move_number = number = packed >> 35
+        squares = self._squares
+        code = squares[end]
+        squares[start] = code
+        squares[end] = captured
+        if code & 7 == GENERAL:
+            self._generals[code >> 3] = start  # reset general location
+        self._touch(start, end)
+        return start, end, captured, key, turn, clock, number
+
+    def _compute_key(self):
+        """returns the Zobrist key of the position computed from scratch"""
+        key = _ZOBRIST_BLACK if self._turn else 0
+        for sq, code in enumerate(self._squares):
+            key ^= _ZOBRIST[code][sq]
+        return key
+
+    def get_key(self):
+        """returns the 64 bit Zobrist key of the position and player to move"""
+        return self._key
+
+    def moves(self, captures_only=False):
+        """
+        returns a tuple of (start, end) square indices of every legal move for the player to move
+        :param captures_only - True to return only the moves that capture a piece
+        """
+        squares = self._squares
+        turn = self._turn
+        if captures_only:
+            legal = self._legal_filter(turn)
+            return tuple((sq, end) for sq in range(SQUARES) if squares[sq] and squares[sq] >> 3 == turn
+                         for end in self._targets(squares[sq], sq)
+                         if squares[end] and legal(squares[sq], sq, end))
+        moves = self._cached_moves()
+        if moves is not None:
+            return moves
+        legal = self._legal_filter(turn)
+        moves = tuple((sq, end) for sq in range(SQUARES) if squares[sq] and squares[sq] >> 3 == turn
+                      for end in self._targets(squares[sq], sq) if legal(squares[sq], sq, end))
+        self._cache_moves(moves)
+        return moves
+
+    def perft(self, depth):
+        """
+        returns the number of legal move sequences depth moves long from the position, used to check move generation
+        :param depth - number of moves in each sequence
+        """
+        if depth <= 0:
+            return 1
+        moves = self.moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for start, end in moves:
+            self.make_move(start, end)
+            nodes += self.perft(depth - 1)
+            self.unmake_move()
+        return nodes
+
+    def in_check(self):
+        """returns True if the player to move has their general in check"""
+        entry = None if self._cache is None else self._cache.probe(self._key)
+        if entry is not None:
+            return entry[-1] == 1
+        return self._attacked(self._generals[self._turn], self._turn ^ 1)
+
+    def _cached_moves(self):
+        """returns the cached legal moves of the position, None if the board has no cache or they aren't cached"""
+        entry = None if self._cache is None else self._cache.probe(self._key)
+        if entry is None:
+            return None
+        return tuple([divmod(move, SQUARES) for move in memoryview(entry)[:-1].cast("H")])
+
+    def _cache_moves(self, moves):
+        """
+        caches the legal moves of the position and whether the player to move is in check, as one bytes entry of the
+        moves packed 16 bits each then a check byte, so long as the entry fits in the table's DATA_BYTES
+        :param moves - legal moves of the position
+        """
+        cache = self._cache
+        if cache is None or _BYTES_SIZE + 2 * len(moves) + 1 > cache.DATA_BYTES:
+            return
+        packed = array("H", [start * SQUARES + end for start, end in moves])
+        check = self._attacked(self._generals[self._turn], self._turn ^ 1)
+        cache.store(self._key, packed.tobytes() + _CHECK_BYTES[check])
+
+    def get_turn(self):
+        """returns the player to move, 'RED' or 'BLACK'"""
+        return PLAYERS[self._turn]
+
+    def get_history(self):
+        """returns the list of (start, end, captured, key, turn, clock, number) records for every move made"""
+        history = self._history
+        return [_unpack_move(history[at], history[at + 1]) for at in range(0, len(history), 2)]
+
+    def get_start_fen(self):
+        """returns the position before the first move on the move stack in Xiangqi FEN, taking every move back"""
+        history = self._history
+        if not history:
+            return self.get_fen()
+        squares = bytearray(self._squares)
+        for at in range(len(history) - 2, -1, -2):
+            packed = history[at]
+            start, end = packed & 127, packed >> 7 & 127
+            squares[start] = squares[end]
+            squares[end] = packed >> 14 & 15
+        start, end, captured, key, turn, clock, number = _unpack_move(history[0], history[1])
+        board = Board()
+        board.set_position(squares, PLAYERS[turn], clock, number)
+        return board.get_fen()
+
     def stalemate(self):
         """Determines if a player is in a stalemate or is in checkmate"""
-        red_stale_count = 0  # counter for red pieces that can't move
-        black_stale_count = 0  # counter for black pieces that can't move
-        red_piece_count = 0
-        black_piece_count = 0
-        # [a,b] represents the current spot/piece being checked on the board
-        a = -1  # main index
-        b = -1  # main index
-        for row in self._board:
-            a += 1
-            b = -1
-            for piece in row:
-                # [c,d] represents the current spot being checked on the board for each piece
-                # starts at [0,0] and moves to [9,8] for each piece to see if a valid move can be made
-                b += 1
-                c = 0  # loop index
-                d = 0  # loop index
-                if piece != "  ":
-                    if piece.get_player() == "RED":
-                        red_piece_count += 1
-                    elif piece.get_player() == "BLACK":
-                        black_piece_count += 1
-                    current = [a, b]  # piece's current location on the board
-                    while c < 10:
-                        move_to = [c, d]  # starting at [0,0]...[9,8]
-                        # current black/red piece tries to make a move to move_to
-                        make_move = self.check_move(current, move_to, "STALE",
-                                                    piece.get_player())
-                        # valid move was found
-                        if make_move:
-                            if piece.get_player() == "RED":  # piece trying to move is red
-                                gencheck = self.gen_check("BLACK")  # check if black checks red's move
-                                if gencheck == "BLACK":  # black checked red's general after move
-                                    self.clear_move(current, move_to)  # clear turn and try again
-                                elif gencheck == "NONE":  # black did not check red's general
-                                    self.clear_move(current, move_to)  # clear move and move to next piece
-                                    c = 10
-                            elif piece.get_player() == "BLACK":  # piece trying to move is black
-                                gencheck2 = self.gen_check("RED")  # check if red checks black's move
-                                if gencheck2 == "RED":  # red checked black's general
-                                    self.clear_move(current, move_to)  # clear turn, try again
-                                elif gencheck2 == "NONE":  # red did not check black's general
-                                    self.clear_move(current, move_to)  # clear move and move to next piece
-                                    c = 10
-
-                        # if all locations for piece have been tried, increment stale counter
-                        if c == 9 and d == 8:
-                            if piece.get_player() == "RED":
-                                red_stale_count += 1
-                            elif piece.get_player() == "BLACK":
-                                black_stale_count += 1
-                        d += 1
-                        if d == 10:
-                            d = 0
-                            c += 1
-        if black_stale_count == black_piece_count:
+        if next(self.legal_moves("BLACK"), None) is None:
             return "BLACK"  # black is stalemated/lost
-        elif red_stale_count == red_piece_count:
+        elif next(self.legal_moves("RED"), None) is None:
             return "RED"  # red is stalemated/lost
         else:
             return "NONE"  # no stalemate/checkmate
 
+    def has_legal_move(self, player, in_check):
+        """
+        returns True as soon as one legal move is found for a player
+        :param player - 'RED' or 'BLACK'
+        :param in_check - True if the player's general is currently in check
+        """
+        squares = self._squares
+        color = PLAYER_INDEX[player]
+        legal = self._legal_filter(color, in_check)
+        general = self._generals[color]
+        # the general's own moves are the likeliest way out of check, so try them first
+        for end in self._targets(squares[general], general):
+            if legal(squares[general], general, end):
+                return True
+        for sq in range(SQUARES):
+            code = squares[sq]
+            if not code or code >> 3 != color or sq == general:
+                continue
+            for end in self._targets(code, sq):
+                if legal(code, sq, end):
+                    return True
+        return False
+
+    def legal_moves(self, player):
+        """
+        yields every legal move for a player as a pair of [row, column] locations
+        the board must not be changed while the moves are being generated
+        :param player - 'RED' or 'BLACK'
+        """
+        squares = self._squares
+        color = PLAYER_INDEX[player]
+        for sq in range(SQUARES):
+            code = squares[sq]
+            if code and code >> 3 == color:
+                move_from = [sq // COLUMNS, sq % COLUMNS]
+                for move_to in self.legal_targets(move_from, player):
+                    yield move_from, move_to
+
+    def legal_targets(self, move_from, player):
+        """
+        returns a list of the [row, column] locations a player's piece can legally move to
+        :param move_from - piece's location
+        :param player - 'RED' or 'BLACK'
+        """
+        start = move_from[0] * COLUMNS + move_from[1]
+        code = self._squares[start]
+        if not code or code >> 3 != PLAYER_INDEX[player]:
+            return []
+        legal = self._legal_filter(code >> 3)
+        return [[end // COLUMNS, end % COLUMNS] for end in self._targets(code, start) if legal(code, start, end)]
+
+    def is_legal_move(self, start, end, player):
+        """
+        returns True if a player can legally move the piece on square start to square end
+        :param start - square index of the piece
+        :param end - square index of the destination
+        :param player - 'RED' or 'BLACK'
+        """
+        if not (0 <= start < SQUARES and 0 <= end < SQUARES):
+            return False
+        squares = self._squares
+        code = squares[start]
+        color = PLAYER_INDEX[player]
+        if not code or code >> 3 != color:
+            return False
+        landing = squares[end]
+        if landing and landing >> 3 == color:
+            return False
+        return self._reachable(code, start, end) and self._is_legal(code, start, end)
+
+    def _is_legal(self, code, start, end):
+        """
+        tries a move from the move tables and returns True if it doesn't leave the player's general in check, the
+        pieces are put back before returning
+        :param code - piece code being moved
+        :param start - square index of the piece
+        :param end - square index of the destination
+        """
+        squares = self._squares
+        color = code >> 3
+        landing = squares[end]
+        squares[start] = EMPTY
+        squares[end] = code
+        generals = self._generals
+        general = generals[color]
+        if code & 7 == GENERAL:
+            generals[color] = end
+        legal = not self.generals_facing() and not self._attacked(generals[color], color ^ 1)
+        generals[color] = general
+        squares[start] = code
+        squares[end] = landing
+        return legal
+
+    def checkers(self, player=None):
+        """
+        returns the squares of the pieces giving check to a player's general, including the other general if they
+        face each other
+        :param player - 'RED' or 'BLACK', or None for the player to move
+        """
+        color = self._turn if player is None else PLAYER_INDEX[player]
+        return self._checkers(self._generals[color], color)
+
+    def _checkers(self, general, color):
+        """
+        returns the squares of the other player's pieces attacking a general, working outward like _attacked
+        :param general - square index of the general
+        :param color - 0 for red, 1 for black, the general's player
+        """
+        squares = self._squares
+        base = (color ^ 1) << 3
+        checkers = []
+        for ray in _RAYS[general]:
+            screen = False
+            for at in ray:
+                code = squares[at]
+                if not code:
+                    continue
+                if screen:
+                    if code == CANNON | base:
+                        checkers.append(at)
+                    break
+                if code == CHARIOT | base or code == GENERAL | base:
+                    checkers.append(at)
+                    break
+                screen = True
+        for at, leg in _HORSE_ATTACKERS[general]:
+            if squares[at] == HORSE | base and not squares[leg]:
+                checkers.append(at)
+        for at in _SOLDIER_ATTACKERS[color ^ 1][general]:
+            if squares[at] == SOLDIER | base:
+                checkers.append(at)
+        for at in _ADVISOR_MOVES[general]:
+            if squares[at] == ADVISOR | base:
+                checkers.append(at)
+        for at, eye in _ELEPHANT_MOVES[general]:
+            if squares[at] == ELEPHANT | base and not squares[eye]:
+                checkers.append(at)
+        for at in _GENERAL_MOVES[general]:
+            if squares[at] == GENERAL | base:
+                checkers.append(at)
+        return checkers
+
+    def pinned(self, player=None):
+        """
+        returns the squares of a player's pieces that can't leave their square's line to the general, or a horse leg
+        next to it, without exposing the general: shields of a chariot or the other general, the screens of a cannon
+        and pieces blocking a horse's leg
+        :param player - 'RED' or 'BLACK', or None for the player to move
+        """
+        color = self._turn if player is None else PLAYER_INDEX[player]
+        squares = self._squares
+        general = self._generals[color]
+        base = (color ^ 1) << 3
+        pinned = []
+        for ray in _RAYS[general]:
+            pieces = [at for at in ray if squares[at]][:3]
+            codes = [squares[at] for at in pieces]
+            if len(codes) >= 2 and (codes[1] == CHARIOT | base or codes[1] == GENERAL | base):
+                pinned.append(pieces[0])
+            elif len(codes) == 3 and codes[2] == CANNON | base:
+                pinned.extend(pieces[:2])
+        for at, leg in _HORSE_ATTACKERS[general]:
+            if squares[at] == HORSE | base and squares[leg]:
+                pinned.append(leg)
+        return [at for at in pinned if squares[at] >> 3 == color]
+
+    def _evasions(self, general, checkers):
+        """
+        returns the squares a move other than the general's must land on, capturing or blocking a checker, and the
+        squares it may instead start from, a checking cannon's screen
+        :param general - square index of the general in check
+        :param checkers - squares of the pieces giving check
+        """
+        squares = self._squares
+        ends = set(checkers)
+        starts = set()
+        for at in checkers:
+            kind = squares[at] & 7
+            between = _BETWEEN[general][at]
+            if between is not None:
+                ends.update(between)  # block a chariot, cannon or facing general
+                if kind == CANNON:
+                    starts.update(sq for sq in between if squares[sq])  # move the screen away
+            elif kind == HORSE:
+                ends.update(leg for horse, leg in _HORSE_ATTACKERS[general] if horse == at)  # block its leg
+            elif kind == ELEPHANT:
+                ends.update(eye for elephant, eye in _ELEPHANT_MOVES[general] if elephant == at)
+        return ends, starts
+
+    def _exposes(self, start, end, general, color):
+        """
+        returns True if moving a piece other than the general from start to end exposes the player's general, which
+        must not be in check now: only a line through the general the piece leaves or lands on, or a horse leg it
+        leaves, can change
+        :param start - square index of the piece
+        :param end - square index of the destination
+        :param general - square index of the player's general
+        :param color - 0 for red, 1 for black
+        """
+        squares = self._squares
+        base = (color ^ 1) << 3
+        for horse, leg in _HORSE_ATTACKERS[general]:
+            if leg == start and horse != end and squares[horse] == HORSE | base:
+                return True
+        directions = _RAY_DIRECTION[general]
+        start_ray = directions[start]
+        end_ray = directions[end]
+        for direction in (start_ray, end_ray) if start_ray != end_ray else (start_ray,):
+            if direction == NO_RAY:
+                continue
+            screen = False
+            for at in _RAYS[general][direction]:
+                if at == end:
+                    code = color << 3  # the moved piece, only its player matters
+                elif at == start:
+                    continue
+                else:
+                    code = squares[at]
+                    if not code:
+                        continue
+                if screen:
+                    if code == CANNON | base:
+                        return True
+                    break
+                if code == CHARIOT | base or code == GENERAL | base:
+                    return True
+                screen = True
+        return False
+
+    def _legal_filter(self, color, in_check=None):
+        """
+        returns a function of (code, start, end) telling if a move from _targets is legal for a player; in check only
+        the general's moves and moves capturing or blocking a checker are tried, otherwise every move but the
+        general's is settled by the pin test in _exposes instead of trying the move
+        :param color - 0 for red, 1 for black
+        :param in_check - False if the player is known not to be in check, None to find out
+        """
+        general = self._generals[color]
+        checkers = self._checkers(general, color) if in_check is not False else ()
+        if checkers:
+            ends, starts = self._evasions(general, checkers)
+
+            def legal(code, start, end):
+                """returns True if an evasion is legal"""
+                if code & 7 != GENERAL and end not in ends and start not in starts:
+                    return False
+                return self._is_legal(code, start, end)
+        else:
+
+            def legal(code, start, end):
+                """returns True if a move is legal"""
+                if code & 7 == GENERAL:
+                    return self._is_legal(code, start, end)
+                return not self._exposes(start, end, general, color)
+        return legal
+
+    def _targets(self, code, start):
+        """
+        returns the squares a piece on square start can reach using the move tables, not counting check
+        :param code - piece code being moved
+        :param start - square index of the piece
+        """
+        squares = self._squares
+        color = code >> 3
+        kind = code & 7
+        if kind == CHARIOT or kind == CANNON:
+            targets = []
+            for ray in _RAYS[start]:
+                screen = False  # cannon has jumped a "screen"
+                for sq in ray:
+                    landing = squares[sq]
+                    if not screen:
+                        if not landing:
+                            targets.append(sq)
+                            continue
+                        if kind == CHARIOT:
+                            if landing >> 3 != color:
+                                targets.append(sq)
+                            break
+                        screen = True
+                    elif landing:
+                        if landing >> 3 != color:
+                            targets.append(sq)
+                        break
+            return targets
+        if kind == HORSE:
+            candidates = [to for to, leg in _HORSE_MOVES[start] if not squares[leg]]
+        elif kind == ELEPHANT:
+            candidates = [to for to, eye in _ELEPHANT_MOVES[start] if not squares[eye]]
+        elif kind == SOLDIER:
+            candidates = _SOLDIER_MOVES[color][start]
+        elif kind == ADVISOR:
+            candidates = _ADVISOR_MOVES[start]
+        else:
+            candidates = _GENERAL_MOVES[start]
+        return [sq for sq in candidates if not squares[sq] or squares[sq] >> 3 != color]
+
     def gen_check(self, player):
         """
         checks if a player is in check
         :param player - 'RED' or 'BLACK
         """
-        a = -1  # main index
-        b = -1  # main index
-        for row in self._board:
-            # [a,b] represents the current spot/piece being checked on the board
-            a += 1
-            b = -1
-            for piece in row:
-                b += 1
-                if piece != "  ":
-                    if piece.get_player() == player:
-                        current = [a, b]
-                        if player == "RED":
-                            make_move = self.check_move(current, self._general_check[0], "GENCHECK",
-                                                        player)  # see if red checks black general
-                            if make_move:
-                                return "RED"  # black general was captured
-
-                        if player == "BLACK":
-                            make_move = self.check_move(current, self._general_check[1], "GENCHECK",
-                                                        player)  # see if black checks red general
-                            if make_move:
-                                return "BLACK"  # red general was captured
-
+        color = PLAYER_INDEX[player]
+        sq = self._generals[color ^ 1]  # opponent's general
+        if not self._dirty and self._dirty is not None:
+            attacked = self._attack_map[color][sq] > 0  # attack map is up to date
+        else:
+            attacked = self._attacked(sq, color)
+        if attacked or self.generals_facing():
+            return player  # opponent's general is in check
         return "NONE"  # general is not in check for player
 
+    def _attacked(self, sq, color):
+        """
+        returns True if any of a player's pieces attack a square, working outward from the square
+        :param sq - square index being attacked
+        :param color - 0 for red, 1 for black
+        """
+        squares = self._squares
+        base = color << 3
+        # chariots are the first piece along a ray, cannons the second
+        chariot = CHARIOT | base
+        cannon = CANNON | base
+        for ray in _RAYS[sq]:
+            screen = False
+            for at in ray:
+                code = squares[at]
+                if not code:
+                    continue
+                if screen:
+                    if code == cannon:
+                        return True
+                    break
+                if code == chariot:
+                    return True
+                screen = True
+        horse = HORSE | base
+        for at, leg in _HORSE_ATTACKERS[sq]:
+            if squares[at] == horse and not squares[leg]:
+                return True
+        soldier = SOLDIER | base
+        for at in _SOLDIER_ATTACKERS[color][sq]:
+            if squares[at] == soldier:
+                return True
+        # advisor, elephant and general moves are symmetric, so their own tables list their attackers
+        advisor = ADVISOR | base
+        for at in _ADVISOR_MOVES[sq]:
+            if squares[at] == advisor:
+                return True
+        elephant = ELEPHANT | base
+        for at, eye in _ELEPHANT_MOVES[sq]:
+            if squares[at] == elephant and not squares[eye]:
+                return True
+        general = GENERAL | base
+        for at in _GENERAL_MOVES[sq]:
+            if squares[at] == general:
+                return True
+        return False
+
+    def is_attacked(self, location, player):
+        """
+        returns how many of a player's pieces attack a [row, column] location
+        :param location - location being attacked
+        :param player - 'RED' or 'BLACK'
+        """
+        self._update_attacks()
+        return self._attack_map[PLAYER_INDEX[player]][location[0] * COLUMNS + location[1]]
+
+    def attack_map(self, player):
+        """
+        returns a list with the number of a player's pieces attacking each square, indexed by row * 9 + column
+        :param player - 'RED' or 'BLACK'
+        """
+        self._update_attacks()
+        return list(self._attack_map[PLAYER_INDEX[player]])
+
+    def _touch(self, start, end):
+        """
+        records two squares whose contents changed so the attack map can be updated around them
+        :param start - square index a piece moved from
+        :param end - square index a piece moved to
+        """
+        dirty = self._dirty
+        if dirty is not None:
+            if len(dirty) < 32:
+                dirty.append(start)
+                dirty.append(end)
+            else:
+                self._dirty = None  # too many changes, rebuild the whole map on the next read
+
+    def _update_attacks(self):
+        """brings the attack map up to date, only pieces whose attacks could have changed are recomputed"""
+        squares = self._squares
+        if self._dirty is None:
+            self._attack_map = (bytearray(SQUARES), bytearray(SQUARES))
+            self._attack_sets = [None] * SQUARES
+            affected = range(SQUARES)
+        else:
+            affected = set()
+            for sq in self._dirty:
+                affected.add(sq)
+                # chariots and cannons looking through the square
+                for ray in _RAYS[sq]:
+                    found = 0
+                    for at in ray:
+                        code = squares[at]
+                        if code:
+                            found += 1
+                            if code & 7 == CHARIOT or code & 7 == CANNON:
+                                affected.add(at)
+                            if found == 2:
+                                break
+                # horses next to the square use it as a leg and elephants diagonal to it use it as an eye
+                row, col = divmod(sq, COLUMNS)
+                for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)):
+                    if _on_board(row + dr, col + dc):
+                        affected.add((row + dr) * COLUMNS + col + dc)
+        attack_map = self._attack_map
+        attack_sets = self._attack_sets
+        for sq in affected:
+            old = attack_sets[sq]
+            if old is not None:
+                counts = attack_map[old[0]]
+                for at in old[1]:
+                    counts[at] -= 1
+                attack_sets[sq] = None
+            code = squares[sq]
+            if code:
+                attacked = self._attack_squares(code, sq)
+                counts = attack_map[code >> 3]
+                for at in attacked:
+                    counts[at] += 1
+                attack_sets[sq] = (code >> 3, attacked)
+        self._dirty = []
+
+    def _attack_squares(self, code, start):
+        """
+        returns the squares a piece on square start attacks, including squares held by its own player
+        :param code - attacking piece code
+        :param start - square index of the piece
+        """
+        squares = self._squares
+        kind = code & 7
+        if kind == CHARIOT or kind == CANNON:
+            attacked = []
+            for ray in _RAYS[start]:
+                screen = kind == CHARIOT  # a chariot attacks up to the first piece, a cannon only past its screen
+                for at in ray:
+                    if screen:
+                        attacked.append(at)
+                    if squares[at]:
+                        if screen:
+                            break
+                        screen = True
+            return tuple(attacked)
+        if kind == HORSE:
+            return tuple(to for to, leg in _HORSE_MOVES[start] if not squares[leg])
+        if kind == ELEPHANT:
+            return tuple(to for to, eye in _ELEPHANT_MOVES[start] if not squares[eye])
+        if kind == SOLDIER:
+            return _SOLDIER_MOVES[code >> 3][start]
+        if kind == ADVISOR:
+            return _ADVISOR_MOVES[start]
+        return _GENERAL_MOVES[start]
+
+
+class TranspositionTable:
+    """
+    Represents a fixed size table of positions keyed by Zobrist key, with methods to probe and store entries. The
+    number of slots comes from a memory budget, so data stored should take at most DATA_BYTES, and a slot is replaced
+    when it is empty, holds the same position, was stored during an earlier search, or holds a result from a shallower
+    or equal depth.
+    """
+
+    ENTRY_BYTES = 256  # memory one filled slot may take, used to turn the budget into a slot count
+    DATA_BYTES = 192  # most memory the data of one slot may take, the rest is its key and bookkeeping
+
+    def __init__(self, megabytes=16):
+        """
+        Constructs a TranspositionTable object with private data members of the slot keys, depths, generations and
+        data, the current search generation, and probe/hit/store counters.
+        :param megabytes - memory budget for the table
+        """
+        slots = 1
+        while slots * 2 * self.ENTRY_BYTES <= megabytes * 1024 * 1024:
+            slots *= 2
+        self._mask = slots - 1
+        self._keys = [0] * slots
+        self._depths = bytearray(slots)
+        self._generations = bytearray(slots)
+        self._data = [None] * slots
+        self._generation = 0
+        self._probes = 0
+        self._hits = 0
+        self._stores = 0
+
+    def __len__(self):
+        """returns the number of slots in the table"""
+        return self._mask + 1
+
+    def probe(self, key):
+        """
+        returns the data stored for a position, or None if it is not in the table
+        :param key - Zobrist key of the position
+        """
+        self._probes += 1
+        index = key & self._mask
+        if self._keys[index] == key and self._data[index] is not None:
+            self._hits += 1
+            return self._data[index]
+        return None
+
+    def probe_depth(self, key):
+        """
+        returns the depth the data for a position was stored with, or -1 if it is not in the table
+        :param key - Zobrist key of the position
+        """
+        index = key & self._mask
+        if self._keys[index] == key and self._data[index] is not None:
+            return self._depths[index]
+        return -1
+
+    def store(self, key, data, depth=0):
+        """
+        stores data for a position if the replacement policy allows it, returns True if it was stored
+        :param key - Zobrist key of the position
+        :param data - data to store, i.e. a search result
+        :param depth - search depth the data came from, deeper results are kept over shallower ones
+        """
+        index = key & self._mask
+        depth = min(depth, 255)
+        if self._data[index] is not None and self._keys[index] != key and \
+                self._generations[index] == self._generation and self._depths[index] > depth:
+            return False
+        self._keys[index] = key
+        self._depths[index] = depth
+        self._generations[index] = self._generation
+        self._data[index] = data
+        self._stores += 1
+        return True
+
+    def new_search(self):
+        """starts a new generation so that entries from earlier searches are replaced first"""
+        self._generation = (self._generation + 1) & 255
+
+    def clear(self):
+        """empties every slot in the table"""
+        self._keys = [0] * len(self)
+        self._depths = bytearray(len(self))
+        self._generations = bytearray(len(self))
+        self._data = [None] * len(self)
+
+    def stats(self):
+        """returns a dictionary of the slot count, probes, hits and stores"""
+        return {"slots": len(self), "probes": self._probes, "hits": self._hits, "stores": self._stores}
+
+
+def _piece_view(code, sq):
+    """
+    returns the shared Piece object for a piece code on square sq, or "  " for an empty space
+    :param code - piece code
+    :param sq - square index of the piece
+    """
+    if code & 7 == SOLDIER and not _same_side(sq // COLUMNS, 9 if code >> 3 == 0 else 0):
+        return _WET_SOLDIERS[code >> 3]  # soldier has crossed the river
+    return _PIECES[code]
+
 
 class Piece:
     """
-    Represents a game piece with methods to get a piece's particular attributes.
+    Represents a game piece with methods to get a piece's particular attributes. Pieces can't be changed once made, so
+    the boards share one of each, see _PIECES.
     """
 
+    __slots__ = ("_player", "_code", "_direction", "_spaces")
+
     def __init__(self, player, code, direction, spaces):
         """
         Constructs a game Piece object with attributes of piece's player, code/symbol, direction, and spaces to move.
         """
-        self._player = player
-        self._code = code
-        self._direction = direction
-        self._spaces = spaces
+        object.__setattr__(self, "_player", player)
+        object.__setattr__(self, "_code", code)
+        object.__setattr__(self, "_direction", direction)
+        object.__setattr__(self, "_spaces", spaces)
+
+    def __setattr__(self, name, value):
+        """pieces are shared between boards, so they can't be changed"""
+        raise AttributeError("Piece objects are immutable")
+
+    def __reduce__(self):
+        """
+        returns how to pickle or copy a piece, a shared piece as a lookup of the shared one so copies of a board still
+        share pieces, any other piece by its attributes
+        """
+        if self in _PIECES:
+            return _shared_piece, (_PIECES.index(self), False)
+        if self in _WET_SOLDIERS:
+            return _shared_piece, (_WET_SOLDIERS.index(self), True)
+        return type(self), (self._player, self._code, self._direction, self._spaces)
 
     def get_player(self):
         """returns a piece's player"""
@@ -640,14 +1550,12 @@ class Piece:
         """returns how many spaces a piece can move"""
         return self._spaces
 
-    def set_direction(self, new):
-        """changes piece's direction type"""
-        self._direction = new
-
 
 class General(Piece):
     """represents a general piece"""
 
+    __slots__ = ()
+
     def __init__(self, player, code="G", direction="ORTHO", spaces=1):
         """constructs a General object with methods inherited from the Piece class"""
         super().__init__(player, code, direction, spaces)
@@ -656,6 +1564,8 @@ class General(Piece):
 class Advisor(Piece):
     """represents an advisor piece"""
 
+    __slots__ = ()
+
     def __init__(self, player, code="A", direction="DIAG", spaces=1):
         """constructs an Advisor object with methods inherited from the Piece class"""
         super().__init__(player, code, direction, spaces)
@@ -664,6 +1574,8 @@ class Advisor(Piece):
 class Elephant(Piece):
     """represents an elephant piece"""
 
+    __slots__ = ()
+
     def __init__(self, player, code="E", direction="DIAG", spaces=2):
         """constructs an Elephant object with methods inherited from the Piece class"""
         super().__init__(player, code, direction, spaces)
@@ -672,6 +1584,8 @@ class Elephant(Piece):
 class Horse(Piece):
     """represents a horse piece"""
 
+    __slots__ = ()
+
     def __init__(self, player, code="H", direction="L", spaces=3):
         """constructs a Horse piece object with methods inherited from the Piece class"""
         super().__init__(player, code, direction, spaces)
@@ -680,6 +1594,8 @@ class Horse(Piece):
 class Chariot(Piece):
     """represents a chariot piece"""
 
+    __slots__ = ()
+
     def __init__(self, player, code="R", direction="ORTHO", spaces=9):
         """constructs a chariot piece object with methods inherited from the Piece class"""
         super().__init__(player, code, direction, spaces)
@@ -688,6 +1604,8 @@ class Chariot(Piece):
 class Cannon(Piece):
     """represents a cannon piece"""
 
+    __slots__ = ()
+
     def __init__(self, player, code="C", direction="ORTHO", spaces=9):
         """constructs a cannon piece object with methods inherited from the Piece class"""
         super().__init__(player, code, direction, spaces)
@@ -696,7 +1614,24 @@ class Cannon(Piece):
 class Soldier(Piece):
     """represents a soldier piece"""
 
+    __slots__ = ()
+
     def __init__(self, player, code="S", direction="DRY", spaces=1):
         """constructs a cannon piece object with methods inherited from the Piece class"""
         super().__init__(player, code, direction, spaces)
 
+
+_PIECE_CLASSES = (None, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier)  # indexed by piece type
+# the shared Piece of every piece code, a soldier's direction comes from its square: "DRY" here and "WET" once it has
+# crossed the river
+_PIECES = tuple(_PIECE_CLASSES[code & 7](PLAYERS[code >> 3]) if code & 7 else "  " for code in range(16))
+_WET_SOLDIERS = tuple(Soldier(player, direction="WET") for player in PLAYERS)
+
+
+def _shared_piece(index, wet):
+    """
+    returns a shared Piece, used to unpickle and copy them, see Piece.__reduce__
+    :param index - piece code, or player index of a soldier across the river
+    :param wet - True for a soldier across the river
+    """
+    return _WET_SOLDIERS[index] if wet else _PIECES[index]
@@ -0,0 +1,196 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: Bulk replay validation of recorded Xiangqi games. Games are read lazily from any iterable of move lists
+# or (fen, moves) records, or from a game record file, replayed with XiangqiGame.make_move in a pool of worker
+# processes, and a verdict is yielded for each game in input order. Only a fixed number of chunks of games are in flight
+# at once, so memory stays bounded however large the input is. From the command line:
+#     python XiangqiReplay.py games.txt --workers 8 > verdicts.jsonl
+#
+# A game record file holds one game per line as whitespace separated moves, each move a from and to coordinate
+# written together or with a dash, i.e. "h3-e3 h10-g8" or "h3e3 h10g8". A game that doesn't start from the opening
+# position has its starting FEN and a colon before its moves, i.e. "4k4/9/9/9/9/9/9/9/4A4/3AK4 w - - 0 1: e1-e2".
+# Blank lines and lines starting with "#" are skipped. A token that isn't a move makes its game fail at that ply as
+# malformed rather than being skipped.
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from XiangqiGame import START_FEN, XiangqiGame
+
+_MOVE = re.compile(r"([a-i](?:10|[1-9]))-?([a-i](?:10|[1-9]))")
+
+
+def parse_moves(line):
+    """
+    returns the list of (from, to) coordinate pairs in a line of a game record file, with None for every token that
+    isn't a move
+    :param line - moves separated by whitespace, i.e. "h3-e3 h10-g8"
+    """
+    moves = []
+    for token in line.split():
+        match = _MOVE.fullmatch(token)
+        moves.append(match.groups() if match else None)
+    return moves
+
+
+def parse_game(line):
+    """
+    returns the starting FEN, None for the opening position, and the move list of a line of a game record file
+    :param line - moves separated by whitespace, optionally after a FEN and a colon
+    """
+    fen, colon, moves = line.rpartition(":")
+    fen = fen.strip()
+    return None if not colon or fen == START_FEN else fen, parse_moves(moves)
+
+
+def split_record(game):
+    """
+    returns the (fen, moves) of a game given as a move list from the opening or as a (fen, moves) record
+    :param game - move list or (fen, moves) tuple, fen None for the opening position
+    """
+    return game if type(game) is tuple else (None, game)
+
+
+def read_records(path):
+    """
+    yields the (fen, moves) record of every game in a game record file, one line at a time, fen None for the opening
+    position
+    :param path - game record file
+    """
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield parse_game(line)
+
+
+def read_games(path):
+    """
+    yields the move list of every game in a game record file, one line at a time, raises ValueError at a game that
+    doesn't start from the opening position, read those with read_records
+    :param path - game record file
+    """
+    for fen, moves in read_records(path):
+        if fen is not None:
+            raise ValueError(path + " has a game starting from " + fen + ", read it with read_records")
+        yield moves
+
+
+def replay_game(moves, fen=None):
+    """
+    replays a game's moves and returns its verdict: whether every move was legal, the index of the first illegal
+    move or None, whether that move was malformed, the number of moves played, the final game state and both
+    players' check status
+    :param moves - list of (from, to) coordinate pairs, None for a token that isn't a move
+    :param fen - starting position in FEN, or None for the opening position; a FEN that can't be loaded is malformed
+    """
+    illegal = None
+    malformed = False
+    try:
+        game = XiangqiGame(fen)
+    except ValueError:
+        game = XiangqiGame()
+        illegal, malformed, moves = 0, True, ()
+    for ply, move in enumerate(moves):
+        if move is None:
+            illegal, malformed = ply, True
+            break
+        if not game.make_move(move[0], move[1]):
+            illegal = ply
+            break
+    return {"legal": illegal is None, "illegal_ply": illegal, "malformed": malformed,
+            "plies": len(moves) if illegal is None else illegal, "state": game.get_game_state(),
+            "red_check": game.is_in_check("red"), "black_check": game.is_in_check("black")}
+
+
+def _replay_chunk(chunk):
+    """
+    returns the verdicts for a chunk of games, run in a worker process
+    :param chunk - list of move lists or (fen, moves) records
+    """
+    verdicts = []
+    for game in chunk:
+        fen, moves = split_record(game)
+        verdicts.append(replay_game(moves, fen))
+    return verdicts
+
+
+def validate_games(games, workers=None, chunk_size=256, max_pending=None):
+    """
+    yields a verdict dictionary with the game's index for every game, in input order
+    :param games - iterable of move lists or (fen, moves) records, read lazily
+    :param workers - number of worker processes, None for one per CPU, 1 to replay in this process
+    :param chunk_size - number of games sent to a worker at once
+    :param max_pending - most chunks in flight at once, None for two per worker
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    games = iter(games)
+    index = 0
+    if workers == 1:
+        for game in games:
+            fen, moves = split_record(game)
+            verdict = replay_game(moves, fen)
+            verdict["game"] = index
+            index += 1
+            yield verdict
+        return
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        while True:
+            # keep the pool busy without reading more of the input than the pending chunks hold
+            while len(pending) < max_pending:
+                chunk = list(islice(games, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_replay_chunk, chunk))
+            if not pending:
+                return
+            for verdict in pending.popleft().result():
+                verdict["game"] = index
+                index += 1
+                yield verdict
+
+
+def validate_file(path, workers=None, chunk_size=256):
+    """
+    yields a verdict for every game in a game record file, in file order
+    :param path - game record file
+    :param workers - number of worker processes, None for one per CPU
+    :param chunk_size - number of games sent to a worker at once
+    """
+    return validate_games(read_records(path), workers, chunk_size)
+
+
+def main(argv=None):
+    """
+    validates a game record file from the command line, printing one JSON verdict per line and a summary on stderr,
+    returns 1 if any game had an illegal move
+    :param argv - command line arguments, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Replay and validate a file of Xiangqi games")
+    parser.add_argument("path", help="game record file, one game per line")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, default one per CPU")
+    parser.add_argument("--chunk-size", type=int, default=256, help="games sent to a worker at once")
+    parser.add_argument("--illegal-only", action="store_true", help="only print games with an illegal move")
+    args = parser.parse_args(argv)
+    games = illegal = 0
+    for verdict in validate_file(args.path, args.workers, args.chunk_size):
+        games += 1
+        if not verdict["legal"]:
+            illegal += 1
+        if verdict["legal"] and args.illegal_only:
+            continue
+        print(json.dumps(verdict))
+    print(json.dumps({"games": games, "illegal": illegal}), file=sys.stderr)
+    return 1 if illegal else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
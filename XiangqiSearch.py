@@ -0,0 +1,391 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: A search engine that chooses moves for a Xiangqi Board. It uses negamax alpha-beta search with
+# iterative deepening, a transposition table, move ordering (table move, captures, killer and history moves) and a
+# quiescence search on captures. A search stops when its time or node budget runs out and returns the best move from
+# the deepest search that finished. ParallelSearcher splits the root moves of a search across a pool of worker
+# processes and merges their results.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from XiangqiGame import CHARIOT, COLUMNS, GENERAL, HORSE, ROWS, SOLDIER, SQUARES, Board, TranspositionTable
+
+MATE = 100000  # score for capturing the general, a mate found n moves away scores MATE - n
+MAX_PLY = 64
+EXACT = 0  # transposition table entry holds the exact score
+LOWER = 1  # entry holds a lower bound, the search failed high
+UPPER = 2  # entry holds an upper bound, the search failed low
+
+# material value of each piece type, indexed by code & 7
+PIECE_VALUES = (0, 0, 200, 200, 400, 900, 450, 100)
+
+
+def _build_square_scores():
+    """
+    builds the score of every piece code on every square from red's point of view, black scores are negative
+    soldiers gain value across the river and nearer the center, horses and chariots gain value nearer the center
+    """
+    scores = []
+    for code in range(16):
+        kind = code & 7
+        sign = -1 if code >> 3 else 1
+        row_scores = []
+        for sq in range(SQUARES):
+            row, col = divmod(sq, COLUMNS)
+            advance = ROWS - 1 - row if sign == 1 else row  # rows moved toward the opponent
+            center = 4 - abs(col - 4)
+            value = PIECE_VALUES[kind] if kind else 0
+            if kind == SOLDIER and advance >= 5:
+                value += 80 + 10 * center + (10 * (advance - 5) if advance < 9 else 0)
+            elif kind == HORSE or kind == CHARIOT:
+                value += 5 * center + (5 * min(advance, 5) if kind == HORSE else 0)
+            row_scores.append(sign * value)
+        scores.append(tuple(row_scores))
+    return tuple(scores)
+
+
+_SQUARE_SCORES = _build_square_scores()
+
+
+class _SearchTimeout(Exception):
+    """raised inside the search when the time or node budget runs out"""
+
+
+class Searcher:
+    """
+    Represents a search for the best move on a Board, with methods to run a search and evaluate a position. The board is
+    searched in place with make_move/unmake_move and is left as it was found.
+    """
+
+    def __init__(self, board, table=None, megabytes=16):
+        """
+        Constructs a Searcher object with private data members of the board, a transposition table, killer moves,
+        history scores, the node count and the search budget.
+        :param board - Board to search
+        :param table - TranspositionTable for search results only, shared with other searches, or None to make one
+        :param megabytes - memory budget for a new transposition table
+        """
+        self._board = board
+        self._table = table if table is not None else TranspositionTable(megabytes)
+        self._killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self._history = [0] * (SQUARES * SQUARES)
+        self._nodes = 0
+        self._deadline = None
+        self._max_nodes = None
+
+    def get_table(self):
+        """returns the search's transposition table"""
+        return self._table
+
+    def evaluate(self):
+        """returns the score of the board from the point of view of the player to move"""
+        score = self._red_score()
+        return -score if self._board.get_turn() == "BLACK" else score
+
+    def _red_score(self):
+        """returns the material and square score of the board from red's point of view"""
+        squares = self._board.get_squares()
+        score = 0
+        for sq in range(SQUARES):
+            code = squares[sq]
+            if code:
+                score += _SQUARE_SCORES[code][sq]
+        return score
+
+    def search(self, time_ms=None, max_depth=MAX_PLY, max_nodes=None, moves=None):
+        """
+        runs an iterative deepening search and returns a dictionary of the best move as (start, end) square indices,
+        its score, the depth reached, the nodes searched, the time taken in milliseconds and the (depth, move, score)
+        of every finished iteration; the move is None if the player to move has no legal move
+        :param time_ms - time budget in milliseconds, or None for no limit
+        :param max_depth - deepest iteration to search
+        :param max_nodes - node budget, or None for no limit
+        :param moves - root moves to search, or None for every legal move
+        """
+        board = self._board
+        started = time.perf_counter()
+        self._deadline = None if time_ms is None else started + time_ms / 1000
+        self._max_nodes = max_nodes
+        self._nodes = 0
+        self._killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self._table.new_search()
+        root_moves = list(board.moves() if moves is None else moves)
+        result = {"move": None, "score": -MATE, "depth": 0, "nodes": 0, "time_ms": 0, "iterations": []}
+        if not root_moves:
+            return result
+        result["move"] = root_moves[0]
+        base = len(board.get_history())
+        score = self._red_score()
+        for depth in range(1, max(1, max_depth) + 1):
+            try:
+                best_move, best_score = self._root(root_moves, depth, score)
+            except _SearchTimeout:
+                # put back every move the interrupted search left on the board
+                while len(board.get_history()) > base:
+                    board.unmake_move()
+                break
+            result["move"], result["score"], result["depth"] = best_move, best_score, depth
+            result["iterations"].append((depth, best_move, best_score))
+            # search the best move first on the next iteration
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+            if abs(best_score) >= MATE - MAX_PLY:
+                break  # forced mate found, searching deeper won't change the move
+        result["nodes"] = self._nodes
+        result["time_ms"] = (time.perf_counter() - started) * 1000
+        return result
+
+    def _root(self, root_moves, depth, score):
+        """
+        searches every root move to a depth, returns the best move and its score
+        :param root_moves - moves to search, best first
+        :param depth - depth to search
+        :param score - material and square score from red's point of view
+        """
+        board = self._board
+        alpha, beta = -MATE - 1, MATE + 1
+        best_move = root_moves[0]
+        for move in root_moves:
+            value = -self._negamax(depth - 1, 1, -beta, -alpha, self._after(score, move))
+            board.unmake_move()
+            if value > alpha:
+                alpha = value
+                best_move = move
+        self._table.store(board.get_key(), (alpha, EXACT, best_move), depth)
+        return best_move, alpha
+
+    def _after(self, score, move):
+        """
+        makes a move on the board and returns the updated red score
+        :param score - score before the move from red's point of view
+        :param move - (start, end) move to make
+        """
+        board = self._board
+        start, end = move
+        code = board.get_squares()[start]
+        scores = _SQUARE_SCORES[code]
+        captured = board.make_move(start, end)
+        return score + scores[end] - scores[start] - _SQUARE_SCORES[captured][end]
+
+    def _tick(self):
+        """counts a node and raises _SearchTimeout when the budget runs out"""
+        self._nodes += 1
+        if self._nodes & 1023 == 0:
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                raise _SearchTimeout
+        if self._max_nodes is not None and self._nodes >= self._max_nodes:
+            raise _SearchTimeout
+
+    def _negamax(self, depth, ply, alpha, beta, score):
+        """
+        returns the score of the board for the player to move, searched to a depth with alpha-beta pruning
+        :param depth - remaining depth
+        :param ply - distance from the root
+        :param alpha - lower bound of the window
+        :param beta - upper bound of the window
+        :param score - material and square score from red's point of view
+        """
+        self._tick()
+        board = self._board
+        in_check = board.in_check()
+        if in_check and ply < MAX_PLY:
+            depth += 1  # look one move further when in check so mates aren't cut off
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiesce(ply, alpha, beta, score)
+        key = board.get_key()
+        table_move = None
+        entry = self._table.probe(key)
+        if entry is not None:
+            table_score, flag, table_move = entry
+            if self._table.probe_depth(key) >= depth:
+                if flag == EXACT or (flag == LOWER and table_score >= beta) or \
+                        (flag == UPPER and table_score <= alpha):
+                    return table_score
+        moves = board.moves()
+        if not moves:
+            return -MATE + ply  # a player with no legal move loses, checkmate or stalemate
+        original_alpha = alpha
+        best_score = -MATE - 1
+        best_move = None
+        squares = board.get_squares()
+        for move in self._order(moves, table_move, ply, squares):
+            value = -self._negamax(depth - 1, ply + 1, -beta, -alpha, self._after(score, move))
+            board.unmake_move()
+            if value > best_score:
+                best_score = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                if not squares[move[1]]:
+                    # quiet move that caused a cutoff, try it early in sibling positions
+                    killers = self._killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self._history[move[0] * SQUARES + move[1]] += depth * depth
+                break
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._table.store(key, (best_score, flag, best_move), depth)
+        return best_score
+
+    def _quiesce(self, ply, alpha, beta, score):
+        """
+        returns the score of the board after searching only captures, so a search doesn't stop in the middle of an
+        exchange
+        :param ply - distance from the root
+        :param alpha - lower bound of the window
+        :param beta - upper bound of the window
+        :param score - material and square score from red's point of view
+        """
+        self._tick()
+        board = self._board
+        stand_pat = -score if board.get_turn() == "BLACK" else score
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        if ply >= MAX_PLY:
+            return alpha
+        squares = board.get_squares()
+        for move in self._order(board.moves(True), None, ply, squares):
+            value = -self._quiesce(ply + 1, -beta, -alpha, self._after(score, move))
+            board.unmake_move()
+            if value >= beta:
+                return value
+            if value > alpha:
+                alpha = value
+        return alpha
+
+    def _order(self, moves, table_move, ply, squares):
+        """
+        returns the moves sorted best first: the transposition table move, captures of the most valuable piece by the
+        least valuable attacker, killer moves, then quiet moves by history score
+        :param moves - moves to sort
+        :param table_move - best move stored in the transposition table, or None
+        :param ply - distance from the root
+        :param squares - board's piece codes
+        """
+        killers = self._killers[ply] if ply <= MAX_PLY else (None, None)
+        history = self._history
+
+        def rank(move):
+            """returns the sort key of a move, lowest first"""
+            if move == table_move:
+                return -10 ** 9
+            victim = squares[move[1]]
+            if victim:
+                if victim & 7 == GENERAL:
+                    return -10 ** 8
+                return -10 ** 7 - PIECE_VALUES[victim & 7] * 16 + PIECE_VALUES[squares[move[0]] & 7]
+            if move == killers[0]:
+                return -10 ** 6
+            if move == killers[1]:
+                return -10 ** 6 + 1
+            return -history[move[0] * SQUARES + move[1]]
+
+        return sorted(moves, key=rank)
+
+
+_worker_table = None  # each worker process keeps its transposition table between searches
+
+
+def _search_worker(squares, player, moves, time_ms, max_depth, max_nodes, megabytes):
+    """
+    searches a share of the root moves in a worker process and returns the Searcher result
+    :param squares - position's 90 piece codes
+    :param player - 'RED' or 'BLACK', the player to move
+    :param moves - root moves for this worker
+    :param time_ms - time budget in milliseconds, or None for no limit
+    :param max_depth - deepest iteration to search
+    :param max_nodes - node budget, or None for no limit
+    :param megabytes - memory budget for the worker's transposition table
+    """
+    global _worker_table
+    if _worker_table is None:
+        _worker_table = TranspositionTable(megabytes)
+    board = Board()
+    board.set_position(squares, player)
+    return Searcher(board, _worker_table).search(time_ms, max_depth, max_nodes, moves)
+
+
+class ParallelSearcher:
+    """
+    Represents a search that splits the root moves across a pool of worker processes, with methods to search a board
+    and shut the pool down. Each worker searches its share of the moves with its own transposition table, and the
+    results are merged at the deepest iteration every worker finished.
+    """
+
+    def __init__(self, workers=None, megabytes=16):
+        """
+        Constructs a ParallelSearcher object with private data members of the worker count, the memory budget of each
+        worker's transposition table, and a process pool made on first use.
+        :param workers - number of worker processes, or None for one per CPU
+        :param megabytes - memory budget for each worker's transposition table
+        """
+        self._workers = max(1, workers or os.cpu_count() or 1)
+        self._megabytes = megabytes
+        self._pool = None
+
+    def get_workers(self):
+        """returns the number of worker processes"""
+        return self._workers
+
+    def __enter__(self):
+        """returns the searcher for use in a with statement"""
+        return self
+
+    def __exit__(self, *exc):
+        """shuts the pool down at the end of a with statement"""
+        self.close()
+
+    def close(self):
+        """shuts down the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def search(self, board, time_ms=None, max_depth=MAX_PLY, max_nodes=None):
+        """
+        searches a board across the worker processes and returns a result dictionary like Searcher.search, with the
+        nodes summed over every worker
+        :param board - Board to search, it isn't changed
+        :param time_ms - time budget in milliseconds, or None for no limit
+        :param max_depth - deepest iteration to search
+        :param max_nodes - node budget for each worker, or None for no limit
+        """
+        started = time.perf_counter()
+        # order the root moves with a quick search so every worker gets a mix of strong and weak moves
+        ordered = Searcher(board, TranspositionTable(1)).search(None, 1)
+        moves = list(board.moves())
+        if ordered["move"] is not None:
+            moves.remove(ordered["move"])
+            moves.insert(0, ordered["move"])
+        shares = [moves[index::self._workers] for index in range(self._workers)]
+        shares = [share for share in shares if share]
+        if len(shares) <= 1:
+            return Searcher(board, megabytes=self._megabytes).search(time_ms, max_depth, max_nodes)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self._workers)
+        squares = bytes(board.get_squares())
+        futures = [self._pool.submit(_search_worker, squares, board.get_turn(), share, time_ms, max_depth, max_nodes,
+                                     self._megabytes) for share in shares]
+        results = [future.result() for future in futures]
+        # scores are only comparable between iterations of the same depth
+        depth = min(result["depth"] for result in results)
+        best = None
+        for result in results:
+            for iteration in result["iterations"]:
+                if iteration[0] == depth and (best is None or iteration[2] > best[2]):
+                    best = iteration
+        merged = {"move": best[1] if best else ordered["move"], "score": best[2] if best else ordered["score"],
+                  "depth": depth, "nodes": sum(result["nodes"] for result in results),
+                  "time_ms": (time.perf_counter() - started) * 1000, "iterations": []}
+        return merged
@@ -0,0 +1,266 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: A self-play driver generating Xiangqi games for tuning. Games are played in a pool of worker processes,
+# each player choosing moves by a policy:
+#     random            a random legal move
+#     search:<depth>    the best move of a fixed depth search, i.e. "search:2"
+#     book:<path>       a move from an opening book, picked by how often it was played, random once out of book
+# The first few plies of every game are random so searching players don't replay the same game. Finished games are
+# streamed to a XiangqiArchive file, and optionally every position played to a positions file, chunk by chunk in game
+# order with only a fixed number of chunks in flight, so memory stays bounded however many games are played. Each game
+# has its own seed, so a run is repeatable with any number of workers. From the command line:
+#     python XiangqiSelfPlay.py 10000 games.xqa --positions positions.bin --red search:2 --black random --workers 8
+#
+# A positions file is fixed size records of
+#     snapshot - 91 byte Board.snapshot of the position, the 90 piece codes then the player to move
+#     move     - 16 bit move played, start * 90 + end square index as in XiangqiArchive
+#     result   - 8 bit signed result for the player to move: 1 won, -1 lost, 0 unfinished
+# all little endian, with no header, so files can be concatenated and read with read_positions.
+
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from XiangqiArchive import ArchiveWriter, decode_move, encode_game, encode_move
+from XiangqiGame import SQUARES, TranspositionTable, XiangqiGame
+
+POSITION = struct.Struct("<%dsHb" % (SQUARES + 1))
+POLICIES = ("random", "search", "book")
+_worker = {}  # policies, opened books and the search table of the game being played, set up by _init_worker
+
+
+def parse_policy(spec):
+    """
+    returns a (name, argument) policy from its command line form, i.e. ("search", 2) for "search:2"
+    :param spec - policy string, see the module description
+    """
+    name, _, argument = spec.partition(":")
+    if name not in POLICIES:
+        raise ValueError("unknown policy " + repr(spec))
+    if name == "search":
+        return name, int(argument or 1)
+    if name == "book":
+        if not argument:
+            raise ValueError("a book policy needs a book file, i.e. book:book.bin")
+        return name, argument
+    return name, None
+
+
+def _init_worker(policies, megabytes):
+    """
+    sets up a process to play games, opening each book once
+    :param policies - (red, black) policies from parse_policy
+    :param megabytes - memory budget for each game's search table
+    """
+    from XiangqiBook import Book
+    books = {}
+    for name, argument in policies:
+        if name == "book" and argument not in books:
+            books[argument] = Book(argument)
+    _worker.update(policies=policies, books=books, table=None, megabytes=megabytes)
+
+
+def _choose(game, policy, rng):
+    """
+    returns a policy's move for the player to move as (start, end) square indices
+    :param game - XiangqiGame being played
+    :param policy - (name, argument) policy
+    :param rng - random.Random of the game
+    """
+    from XiangqiSearch import Searcher
+    name, argument = policy
+    board = game.get_board_object()
+    if name == "search":
+        if _worker["table"] is None:
+            _worker["table"] = TranspositionTable(_worker["megabytes"])
+        return Searcher(board, _worker["table"]).search(None, argument)["move"]
+    if name == "book":
+        move = _worker["books"][argument].choose(board, rng)
+        if move is not None:
+            return move
+    return rng.choice(board.moves())
+
+
+def play_game(seed, random_plies=8, max_plies=300):
+    """
+    plays one game with the policies set up by _init_worker, returns its game record, final state, number of plies and
+    the packed positions played
+    :param seed - seed of the game's random choices
+    :param random_plies - plies played at random before the policies take over
+    :param max_plies - plies after which the game is stopped unfinished
+    """
+    rng = random.Random(seed)
+    policies = _worker["policies"]
+    game = XiangqiGame()
+    board = game.get_board_object()
+    _worker["table"] = None  # a fresh table per game keeps games the same whichever worker plays them
+    played = []  # (snapshot, move, color) of every ply
+    for ply in range(max_plies):
+        if game.get_game_state() != "UNFINISHED":
+            break
+        color = ply & 1
+        if ply < random_plies:
+            start, end = rng.choice(board.moves())
+        else:
+            start, end = _choose(game, policies[color], rng)
+        played.append((game.snapshot(), encode_move(start, end), color))
+        game.make_move(start, end)
+    state = game.get_game_state()
+    winner = 0 if state == "RED_WON" else 1 if state == "BLACK_WON" else None
+    positions = b"".join(POSITION.pack(snapshot, move, 0 if winner is None else 1 if color == winner else -1)
+                         for snapshot, move, color in played)
+    record = encode_game(decode_move(move) for snapshot, move, color in played)
+    return record, state, len(played), positions
+
+
+def _play_chunk(seeds, random_plies, max_plies):
+    """
+    returns the results of a chunk of games, run in a worker process
+    :param seeds - seed of each game
+    :param random_plies - plies played at random before the policies take over
+    :param max_plies - plies after which a game is stopped unfinished
+    """
+    return [play_game(seed, random_plies, max_plies) for seed in seeds]
+
+
+def self_play(games, archive_path, positions_path=None, red="random", black="random", workers=None, chunk_size=16,
+              max_pending=None, seed=0, random_plies=8, max_plies=300, megabytes=16, report=None, report_seconds=5.0):
+    """
+    plays games and writes them to an archive, returns a dictionary of the games, plies and results played, the time
+    taken and the games per second
+    :param games - number of games to play
+    :param archive_path - XiangqiArchive file to write the games to
+    :param positions_path - positions file to write every position played to, or None
+    :param red - red's policy string, see parse_policy
+    :param black - black's policy string
+    :param workers - number of worker processes, None for one per CPU, 1 to play in this process
+    :param chunk_size - number of games sent to a worker at once
+    :param max_pending - most chunks in flight at once, None for two per worker
+    :param seed - seed of the first game, each later game's seed is one more
+    :param random_plies - plies of each game played at random before the policies take over
+    :param max_plies - plies after which a game is stopped unfinished
+    :param megabytes - memory budget for each worker's search table
+    :param report - function called with the stats so far every report_seconds, or None
+    :param report_seconds - time between reports
+    """
+    policies = (parse_policy(red), parse_policy(black))
+    workers = max(1, workers or os.cpu_count() or 1)
+    max_pending = max_pending or 2 * workers
+    chunks = ([seed + at for at in range(first, min(first + chunk_size, games))]
+              for first in range(0, games, chunk_size))
+    stats = {"games": 0, "plies": 0, "RED_WON": 0, "BLACK_WON": 0, "UNFINISHED": 0, "seconds": 0.0,
+             "games_per_second": 0.0}
+    started = last_report = time.perf_counter()
+    positions = open(positions_path, "wb") if positions_path else None
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(policies, megabytes)) \
+        if workers > 1 else None
+    try:
+        with ArchiveWriter(archive_path) as archive:
+            if pool is None:
+                _init_worker(policies, megabytes)
+                results = (_play_chunk(chunk, random_plies, max_plies) for chunk in chunks)
+            else:
+                results = _pool_results(pool, chunks, max_pending, random_plies, max_plies)
+            for results_chunk in results:
+                for record, state, plies, packed in results_chunk:
+                    archive.add_record(record)
+                    stats["games"] += 1
+                    stats["plies"] += plies
+                    stats[state] += 1
+                if positions is not None:
+                    positions.write(b"".join(packed for record, state, plies, packed in results_chunk))
+                now = time.perf_counter()
+                stats["seconds"] = now - started
+                stats["games_per_second"] = stats["games"] / stats["seconds"] if stats["seconds"] else 0.0
+                if report is not None and now - last_report >= report_seconds:
+                    report(dict(stats))
+                    last_report = now
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if positions is not None:
+            positions.close()
+    return stats
+
+
+def _pool_results(pool, chunks, max_pending, random_plies, max_plies):
+    """
+    yields the results of each chunk of games played in a process pool, in order, with at most max_pending in flight
+    :param pool - ProcessPoolExecutor set up by _init_worker
+    :param chunks - iterator of lists of game seeds
+    :param max_pending - most chunks in flight at once
+    :param random_plies - plies played at random before the policies take over
+    :param max_plies - plies after which a game is stopped unfinished
+    """
+    pending = deque()
+    while True:
+        while len(pending) < max_pending:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            pending.append(pool.submit(_play_chunk, chunk, random_plies, max_plies))
+        if not pending:
+            return
+        yield pending.popleft().result()
+
+
+def read_positions(path):
+    """
+    yields the (snapshot, (start, end), result) of every record in a positions file
+    :param path - positions file written by self_play
+    """
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(POSITION.size * 4096)
+            if not data:
+                return
+            if len(data) % POSITION.size:
+                raise ValueError(path + " is not a positions file")
+            for snapshot, move, result in POSITION.iter_unpack(data):
+                yield snapshot, decode_move(move), result
+
+
+def main(argv=None):
+    """
+    plays self-play games from the command line, reporting progress on stderr
+    :param argv - command line arguments, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Generate Xiangqi self-play games")
+    parser.add_argument("games", type=int, help="number of games to play")
+    parser.add_argument("archive", help="game archive file to write")
+    parser.add_argument("--positions", help="positions file to write")
+    parser.add_argument("--red", default="random", help="red's policy: random, search:<depth> or book:<path>")
+    parser.add_argument("--black", default="random", help="black's policy")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, default one per CPU")
+    parser.add_argument("--chunk-size", type=int, default=16, help="games sent to a worker at once")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--random-plies", type=int, default=8, help="plies played at random at the start")
+    parser.add_argument("--max-plies", type=int, default=300, help="plies after which a game is stopped")
+    parser.add_argument("--megabytes", type=int, default=16, help="search table size per worker")
+    args = parser.parse_args(argv)
+    try:
+        parse_policy(args.red)
+        parse_policy(args.black)
+    except ValueError as error:
+        parser.error(str(error))
+
+    def report(stats):
+        """prints progress to stderr"""
+        print("%d games, %d plies, %.1f games/s" % (stats["games"], stats["plies"], stats["games_per_second"]),
+              file=sys.stderr)
+
+    stats = self_play(args.games, args.archive, args.positions, args.red, args.black, args.workers, args.chunk_size,
+                      None, args.seed, args.random_plies, args.max_plies, args.megabytes, report)
+    report(stats)
+    print("red won %d, black won %d, unfinished %d" % (stats["RED_WON"], stats["BLACK_WON"], stats["UNFINISHED"]),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
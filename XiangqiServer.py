@@ -0,0 +1,357 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: An asyncio server hosting many XiangqiGame sessions over TCP. Requests and replies are JSON objects, one
+# per line, and a request's "id" is copied into its reply so a client can match them up:
+#     {"id": 1, "op": "new"}                                  -> {"id": 1, "ok": true, "game": "1", "fen": ...}
+#     {"id": 2, "op": "move", "game": "1", "from": "h3", "to": "e3"}
+#     {"id": 3, "op": "state", "game": "1"}
+#     {"id": 4, "op": "moves", "game": "1"}
+#     {"id": 5, "op": "best", "game": "1", "time_ms": 500}
+#     {"id": 6, "op": "close", "game": "1"}
+# A search's time_ms, 1000 by default, can't be more than the server's max_search_ms, and its depth, if given, must
+# be 1 to MAX_DEPTH, so no client can hold a search process indefinitely. Each session works through its own queue of
+# requests in order, making moves on a thread pool and searching in a process pool, so the event loop keeps answering
+# other sessions while one is busy. A full session queue stops the server reading from that connection until there is
+# room, and replies wait for the client to read them, so a fast client can't queue unbounded work. Every session's
+# position is saved to a snapshot file every few seconds and loaded again on start. From the command line:
+#     python XiangqiServer.py --port 9000 --snapshot sessions.json
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from XiangqiGame import XiangqiGame
+from XiangqiSearch import MAX_PLY
+
+MAX_LINE = 1 << 16  # longest request line read
+MAX_DEPTH = MAX_PLY  # deepest search a client can ask for
+
+
+def _search(fen, time_ms, depth):
+    """
+    returns the best move of a position as a pair of algebraic coordinates, run in a search process
+    :param fen - position in FEN
+    :param time_ms - time budget in milliseconds
+    :param depth - deepest search depth, or None for no limit
+    """
+    return XiangqiGame(fen).best_move(time_ms, depth)
+
+
+def _search_budget(request, max_search_ms):
+    """
+    returns the (time_ms, depth) of a best request, raises ValueError if either is missing or out of range
+    :param request - request dictionary
+    :param max_search_ms - longest search allowed in milliseconds
+    """
+    time_ms = request.get("time_ms", 1000)
+    depth = request.get("depth")
+    if type(time_ms) is not int or not 1 <= time_ms <= max_search_ms:
+        raise ValueError("time_ms must be a whole number from 1 to " + str(max_search_ms))
+    if depth is not None and (type(depth) is not int or not 1 <= depth <= MAX_DEPTH):
+        raise ValueError("depth must be a whole number from 1 to " + str(MAX_DEPTH))
+    return time_ms, depth
+
+
+def _game_reply(game):
+    """
+    returns the reply fields describing a game
+    :param game - XiangqiGame
+    """
+    return {"fen": game.get_fen(), "state": game.get_game_state(), "player": game.get_current_player(),
+            "red_check": game.is_in_check("red"), "black_check": game.is_in_check("black")}
+
+
+class Session:
+    """
+    Represents one hosted game, with its queue of requests waiting to run and the task running them in order.
+    """
+
+    def __init__(self, name, game, queue_size):
+        """
+        Constructs a session with data members of its name, game, last known position, request queue, the task
+        working through it and whether it has been closed.
+        :param name - session name used by clients
+        :param game - XiangqiGame being played
+        :param queue_size - most requests waiting at once
+        """
+        self.name = name
+        self.game = game
+        self.fen = game.get_fen()  # read by snapshots, which mustn't touch a game a thread may be moving in
+        self.queue = asyncio.Queue(queue_size)
+        self.task = None
+        self.closed = False
+
+
+class GameServer:
+    """
+    Represents the asyncio game server, with methods to start and stop serving, handle requests and save and load
+    session snapshots.
+    """
+
+    def __init__(self, host="127.0.0.1", port=9000, max_sessions=10000, queue_size=16, threads=4, search_workers=1,
+                 snapshot_path=None, snapshot_seconds=5.0, max_search_ms=10000):
+        """
+        Constructs a game server with private data members of its address, limits, sessions, executors and snapshot
+        settings.
+        :param host - address to listen on
+        :param port - port to listen on, 0 for any free port
+        :param max_sessions - most sessions hosted at once
+        :param queue_size - most requests waiting in one session's queue
+        :param threads - threads making moves
+        :param search_workers - processes searching, None for one per CPU
+        :param snapshot_path - file to save sessions to and load them from, or None for no snapshots
+        :param snapshot_seconds - time between snapshots
+        :param max_search_ms - longest search a client can ask for in milliseconds
+        """
+        self._host = host
+        self._port = port
+        self._max_sessions = max_sessions
+        self._queue_size = queue_size
+        self._threads = ThreadPoolExecutor(threads)
+        self._search_pool = ProcessPoolExecutor(search_workers)
+        self._snapshot_path = snapshot_path
+        self._snapshot_seconds = snapshot_seconds
+        self._max_search_ms = max_search_ms
+        self._sessions = {}
+        self._next_name = 1
+        self._server = None
+        self._snapshot_task = None
+
+    def get_port(self):
+        """returns the port the server listens on, once started"""
+        return self._server.sockets[0].getsockname()[1] if self._server else self._port
+
+    def get_sessions(self):
+        """returns the dictionary of session name to Session"""
+        return self._sessions
+
+    async def start(self):
+        """loads the snapshot, if any, and starts listening and taking snapshots"""
+        if self._snapshot_path and os.path.exists(self._snapshot_path):
+            self.load_snapshot(self._snapshot_path)
+        self._server = await asyncio.start_server(self._connection, self._host, self._port, limit=MAX_LINE)
+        if self._snapshot_path:
+            self._snapshot_task = asyncio.ensure_future(self._snapshots())
+
+    async def serve_forever(self):
+        """starts the server and serves until cancelled"""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """stops listening, finishes every session's task, saves a last snapshot and shuts the executors down"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+        for session in list(self._sessions.values()):
+            session.task.cancel()
+        if self._snapshot_path:
+            self.save_snapshot(self._snapshot_path)
+        self._threads.shutdown()
+        self._search_pool.shutdown()
+
+    def _new_session(self, game, name=None):
+        """
+        starts hosting a game and returns its Session
+        :param game - XiangqiGame to host
+        :param name - session name, or None for the next free one
+        """
+        if name is None:
+            while str(self._next_name) in self._sessions:
+                self._next_name += 1
+            name = str(self._next_name)
+        session = Session(name, game, self._queue_size)
+        session.task = asyncio.ensure_future(self._run_session(session))
+        self._sessions[name] = session
+        return session
+
+    async def _connection(self, reader, writer):
+        """
+        reads a client's requests until it disconnects, queueing each on its session
+        :param reader - asyncio.StreamReader of the connection
+        :param writer - asyncio.StreamWriter of the connection
+        """
+        lock = asyncio.Lock()
+
+        async def send(reply):
+            """writes a reply line, waiting while the client is slow to read"""
+            async with lock:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # line longer than MAX_LINE
+                    await send({"ok": False, "error": "request too long"})
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    await send({"ok": False, "error": "request is not a JSON object"})
+                    continue
+                await self._dispatch(request, send)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request, send):
+        """
+        answers a request that doesn't need a session, or queues it on its session, waiting while the queue is full
+        :param request - request dictionary
+        :param send - coroutine function writing a reply
+        """
+        op = request.get("op")
+        reply = {"id": request.get("id")}
+        if op == "new":
+            fen = request.get("fen")
+            if len(self._sessions) >= self._max_sessions:
+                reply.update(ok=False, error="too many sessions")
+            elif fen is not None and not isinstance(fen, str):
+                reply.update(ok=False, error="fen must be a string")
+            else:
+                try:
+                    game = XiangqiGame(fen)
+                except ValueError as error:
+                    reply.update(ok=False, error=str(error))
+                else:
+                    session = self._new_session(game)
+                    reply.update(ok=True, game=session.name, **_game_reply(game))
+            await send(reply)
+            return
+        session = self._sessions.get(str(request.get("game")))
+        if session is None:
+            reply.update(ok=False, error="no such game")
+            await send(reply)
+            return
+        await session.queue.put((request, send))  # backpressure: stops reading this connection while the queue is full
+        if session.closed:  # closed while this request waited for room, no task is left to answer it
+            await self._reject_queued(session)
+
+    async def _reject_queued(self, session):
+        """
+        answers every request left in a closed session's queue with an error
+        :param session - closed Session
+        """
+        while not session.queue.empty():
+            request, send = session.queue.get_nowait()
+            try:
+                await send({"id": request.get("id"), "game": session.name, "ok": False, "error": "no such game"})
+            except ConnectionError:
+                pass
+
+    async def _run_session(self, session):
+        """
+        works through a session's queued requests in order until it is closed
+        :param session - Session to run
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            request, send = await session.queue.get()
+            op = request.get("op")
+            reply = {"id": request.get("id"), "game": session.name}
+            game = session.game
+            try:
+                if op == "move":
+                    valid = await loop.run_in_executor(self._threads, game.make_move, request.get("from"),
+                                                       request.get("to"))
+                    reply.update(ok=valid, **_game_reply(game))
+                elif op == "state":
+                    reply.update(ok=True, **_game_reply(game))
+                elif op == "moves":
+                    moves = await loop.run_in_executor(self._threads, lambda: list(game.legal_moves()))
+                    reply.update(ok=True, moves=moves)
+                elif op == "best":
+                    move = None
+                    time_ms, depth = _search_budget(request, self._max_search_ms)
+                    if game.get_game_state() == "UNFINISHED":
+                        move = await loop.run_in_executor(self._search_pool, _search, game.get_fen(), time_ms, depth)
+                    reply.update(ok=move is not None, move=move)
+                elif op == "close":
+                    del self._sessions[session.name]
+                    session.closed = True
+                    reply.update(ok=True)
+                else:
+                    reply.update(ok=False, error="unknown op " + repr(op))
+            except Exception as error:  # a bad request mustn't stop the session
+                reply.update(ok=False, error=str(error))
+            if "fen" in reply:
+                session.fen = reply["fen"]
+            try:
+                await send(reply)
+            except ConnectionError:
+                pass
+            if session.closed:
+                await self._reject_queued(session)
+                return
+
+    def save_snapshot(self, path):
+        """
+        writes every session's position to a snapshot file, replacing the old file only once the new one is written
+        :param path - snapshot file
+        """
+        sessions = {name: session.fen for name, session in list(self._sessions.items())}
+        temporary = path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump({"sessions": sessions}, file)
+        os.replace(temporary, path)
+
+    def load_snapshot(self, path):
+        """
+        starts hosting every session saved in a snapshot file
+        :param path - snapshot file
+        """
+        with open(path) as file:
+            sessions = json.load(file)["sessions"]
+        for name, fen in sessions.items():
+            self._new_session(XiangqiGame(fen), name)
+
+    async def _snapshots(self):
+        """saves a snapshot every snapshot_seconds, writing the file on a thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._snapshot_seconds)
+            await loop.run_in_executor(self._threads, self.save_snapshot, self._snapshot_path)
+
+
+def main(argv=None):
+    """
+    runs the game server from the command line until interrupted
+    :param argv - command line arguments, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Host Xiangqi games over TCP")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=9000, help="port to listen on")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="most sessions hosted at once")
+    parser.add_argument("--queue-size", type=int, default=16, help="most requests waiting per session")
+    parser.add_argument("--threads", type=int, default=4, help="threads making moves")
+    parser.add_argument("--search-workers", type=int, default=None, help="search processes, default one per CPU")
+    parser.add_argument("--snapshot", help="file to save sessions to and load them from")
+    parser.add_argument("--snapshot-seconds", type=float, default=5.0, help="time between snapshots")
+    parser.add_argument("--max-search-ms", type=int, default=10000, help="longest search a client can ask for")
+    args = parser.parse_args(argv)
+    server = GameServer(args.host, args.port, args.max_sessions, args.queue_size, args.threads, args.search_workers,
+                        args.snapshot, args.snapshot_seconds, args.max_search_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
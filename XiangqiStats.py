@@ -0,0 +1,189 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: Optional instrumentation of the Board and XiangqiGame hot paths. enable() wraps the instrumented methods
+# on their classes to count and time every call, and disable() puts the original methods back, so there is no cost at
+# all while it is off. Times are inclusive, a make_move's time includes the validation and stalemate scan inside it.
+# The names recorded are
+#     game.make_move            XiangqiGame.make_move, parsing the coordinates and playing the move
+#     game.play                 the part after parsing: validation, the move and the post-move scans
+#     board.is_legal_move       validation of the move
+#     board.make_move           the move itself
+#     board.in_check            check status of the player moving next
+#     board.has_legal_move      the post-move stalemate/checkmate scan
+#     board.check_move.<mode>   Board.check_move by its function argument, i.e. board.check_move.GENCHECK
+#     board.gen_check, board.stalemate, board.clear_move
+# Stats are kept for the whole process and for each game, covering the Board calls made inside its make_move, i.e.
+#     XiangqiStats.enable()
+#     game.make_move("h3", "e3")
+#     game.get_stats()["board.has_legal_move"]   -> {"calls": 1, "seconds": ..., "max_seconds": ...}
+#     XiangqiStats.process_stats()
+# A hook passed to enable is called with the name and seconds of every call, i.e. to report slow calls to a sampling
+# profiler or tracing system while they are still recent.
+
+import threading
+from functools import wraps
+from time import perf_counter
+
+from XiangqiGame import Board, XiangqiGame
+
+_BOARD_METHODS = ("make_move", "is_legal_move", "in_check", "has_legal_move", "gen_check", "stalemate", "clear_move")
+_originals = {}  # (class, method name) -> original function while enabled
+_local = threading.local()  # stats of the game whose make_move is running on this thread
+
+
+class Stats:
+    """
+    Represents call counts and times by name, with methods to add a call, read the stats and reset them.
+    """
+
+    def __init__(self):
+        """Constructs empty stats with a private data member of [calls, seconds, max seconds] by name."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        """
+        records one call
+        :param name - name of the call, i.e. "board.gen_check"
+        :param seconds - time the call took
+        """
+        with self._lock:
+            entry = self._calls.get(name)
+            if entry is None:
+                self._calls[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def get_stats(self):
+        """returns a dictionary of name to {"calls", "seconds", "max_seconds"}"""
+        with self._lock:
+            return {name: {"calls": calls, "seconds": seconds, "max_seconds": longest}
+                    for name, (calls, seconds, longest) in self._calls.items()}
+
+    def reset(self):
+        """clears every count and time"""
+        with self._lock:
+            self._calls.clear()
+
+
+PROCESS_STATS = Stats()
+
+
+def _record(name, seconds, hook):
+    """
+    adds a call to the process stats, the running game's stats and the hook
+    :param name - name of the call
+    :param seconds - time the call took
+    :param hook - function called with the name and seconds, or None
+    """
+    PROCESS_STATS.add(name, seconds)
+    game_stats = getattr(_local, "stats", None)
+    if game_stats is not None:
+        game_stats.add(name, seconds)
+    if hook is not None:
+        hook(name, seconds)
+
+
+def _timed(name, function, hook):
+    """
+    returns a wrapper of a method recording each call under a name
+    :param name - name to record calls as
+    :param function - method to wrap
+    :param hook - function called with the name and seconds of every call, or None
+    """
+    @wraps(function)
+    def timed(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _record(name, perf_counter() - started, hook)
+    return timed
+
+
+def _timed_check_move(function, hook):
+    """
+    returns a wrapper of Board.check_move recording each call under its function mode
+    :param function - Board.check_move
+    :param hook - function called with the name and seconds of every call, or None
+    """
+    @wraps(function)
+    def check_move(self, move_from, move_to, mode, player):
+        started = perf_counter()
+        try:
+            return function(self, move_from, move_to, mode, player)
+        finally:
+            _record("board.check_move." + str(mode), perf_counter() - started, hook)
+    return check_move
+
+
+def _timed_game_move(function, hook):
+    """
+    returns a wrapper of XiangqiGame.make_move recording each call, with the Board calls inside it also recorded in
+    the game's stats
+    :param function - XiangqiGame.make_move
+    :param hook - function called with the name and seconds of every call, or None
+    """
+    @wraps(function)
+    def make_move(self, move_from, move_to=None):
+        if self._stats is None:
+            self._stats = Stats()
+        outer = getattr(_local, "stats", None)
+        _local.stats = self._stats
+        started = perf_counter()
+        try:
+            return function(self, move_from, move_to)
+        finally:
+            _record("game.make_move", perf_counter() - started, hook)
+            _local.stats = outer
+    return make_move
+
+
+def _wrap(cls, name, wrapper):
+    """
+    replaces a method on a class, remembering the original
+    :param cls - class to patch
+    :param name - method name
+    :param wrapper - function taking the original and returning its replacement
+    """
+    original = cls.__dict__[name]
+    _originals[(cls, name)] = original
+    setattr(cls, name, wrapper(original))
+
+
+def enable(hook=None):
+    """
+    starts counting and timing the instrumented methods, replacing any hook given before
+    :param hook - function called with the name and seconds of every call, or None
+    """
+    disable()
+    for name in _BOARD_METHODS:
+        _wrap(Board, name, lambda original, name=name: _timed("board." + name, original, hook))
+    _wrap(Board, "check_move", lambda original: _timed_check_move(original, hook))
+    _wrap(XiangqiGame, "make_move", lambda original: _timed_game_move(original, hook))
+    _wrap(XiangqiGame, "_play", lambda original: _timed("game.play", original, hook))
+
+
+def disable():
+    """stops instrumenting, putting the original methods back; the stats recorded so far are kept"""
+    for (cls, name), original in _originals.items():
+        setattr(cls, name, original)
+    _originals.clear()
+
+
+def is_enabled():
+    """returns True while the methods are instrumented"""
+    return bool(_originals)
+
+
+def process_stats():
+    """returns the process wide stats, see Stats.get_stats"""
+    return PROCESS_STATS.get_stats()
+
+
+def reset():
+    """clears the process wide stats"""
+    PROCESS_STATS.reset()
@@ -0,0 +1,497 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: Endgame tablebases for Xiangqi positions with a few pieces. A material set such as "KRkaa" (red general
+# and chariot against black general and two advisors, in FEN letters) is generated by listing every placement of its
+# pieces, working out which are legal, and running retrograde analysis back from the positions with no legal moves,
+# which in Xiangqi lose. The result is stored as one 16 bit value per placement in a file named after the material, so
+# a position is looked up by computing its index. From the command line:
+#     python XiangqiTablebase.py KRkaa KNPk --directory tables --workers 8
+#
+# A value is the number of moves (plies) to the end of the game with best play, odd when the player to move wins and
+# even when they lose, 0 meaning they have no legal move now. DRAW marks positions neither player can force, and
+# INVALID placements that can't happen, pieces on the same square or the player who just moved left in check.
+# Repetition rules (perpetual check and chase) are not modelled, so those lines count as draws.
+#
+# A position's index is its player to move plus twice a mixed radix number with one digit per piece, the digit being
+# the piece's place in the list of squares that piece can ever stand on (generals and advisors in their castle,
+# elephants on their side of the river, soldiers forward of their start). Black-strong endings are looked up in the
+# red-strong table by mirroring the board, so "KRkaa" also answers "KAAkr".
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from XiangqiGame import (ADVISOR, BLACK_PIECE, CANNON, CHARIOT, COLUMNS, ELEPHANT, FEN_CODES, FEN_LETTERS, GENERAL,
+                         HORSE, PLAYERS, PLAYER_INDEX, ROWS, SOLDIER, SQUARES, Board, _ADVISOR_MOVES, _ELEPHANT_MOVES,
+                         _GENERAL_MOVES, _HORSE_ATTACKERS, _RAYS, _SOLDIER_ATTACKERS, _SOLDIER_MOVES, _START_SQUARES)
+
+MAGIC = b"XQTB"
+VERSION = 1
+HEADER = struct.Struct("<4sI16sQ")  # magic, version, material, number of values
+DRAW = -1
+INVALID = -2
+EXTENSION = ".xtb"
+
+
+def _placements(code):
+    """
+    returns the tuple of squares a piece can ever stand on, found by following its moves out from its start squares
+    :param code - piece code
+    """
+    kind = code & 7
+    if kind in (HORSE, CHARIOT, CANNON):
+        return tuple(range(SQUARES))
+    if kind == GENERAL:
+        moves = _GENERAL_MOVES
+    elif kind == ADVISOR:
+        moves = _ADVISOR_MOVES
+    elif kind == ELEPHANT:
+        moves = tuple(tuple(to for to, eye in squares) for squares in _ELEPHANT_MOVES)
+    else:
+        moves = _SOLDIER_MOVES[code >> 3]
+    found = {sq for sq in range(SQUARES) if _START_SQUARES[sq] == code}
+    frontier = list(found)
+    while frontier:
+        for to in moves[frontier.pop()]:
+            if to not in found:
+                found.add(to)
+                frontier.append(to)
+    return tuple(sorted(found))
+
+
+def parse_material(material):
+    """
+    returns the sorted piece codes of a material set, raises ValueError if it isn't one
+    :param material - FEN letters of every piece, red upper case, i.e. "KRkaa"
+    """
+    try:
+        codes = sorted(FEN_CODES[letter] for letter in material)
+    except KeyError:
+        raise ValueError("unknown piece in material " + repr(material))
+    if codes.count(GENERAL) != 1 or codes.count(GENERAL | BLACK_PIECE) != 1:
+        raise ValueError("material needs one general each: " + repr(material))
+    if len(codes) > 16:
+        raise ValueError("material has too many pieces: " + repr(material))
+    return tuple(codes)
+
+
+def material_name(codes):
+    """
+    returns the canonical material name of some piece codes, i.e. "KRkaa"
+    :param codes - piece codes in any order
+    """
+    return "".join(FEN_LETTERS[code] for code in sorted(codes))
+
+
+def _mirror(squares):
+    """
+    returns a board's 90 piece codes with the board turned upside down and the players' colors swapped
+    :param squares - 90 piece codes
+    """
+    mirrored = bytearray(SQUARES)
+    for sq, code in enumerate(squares):
+        if code:
+            row, col = divmod(sq, COLUMNS)
+            mirrored[(ROWS - 1 - row) * COLUMNS + col] = code ^ BLACK_PIECE
+    return mirrored
+
+
+class Tablebase:
+    """
+    Represents the tablebase of one material set, with methods to convert between positions and indices, look up a
+    value and save the values to a file.
+    """
+
+    def __init__(self, material, values=None):
+        """
+        Constructs a tablebase with private data members of its material name, piece codes, the squares each piece can
+        stand on, index strides and values.
+        :param material - FEN letters of every piece, i.e. "KRkaa"
+        :param values - sequence of 16 bit values indexed by position index, or None before generation
+        """
+        self._codes = parse_material(material)
+        self._material = material_name(self._codes)
+        self._squares = tuple(_placements(code) for code in self._codes)
+        # place of every square in each piece's list of squares, -1 where it can't stand
+        self._places = []
+        for squares in self._squares:
+            places = [-1] * SQUARES
+            for place, sq in enumerate(squares):
+                places[sq] = place
+            self._places.append(places)
+        self._strides = []
+        size = 2
+        for squares in reversed(self._squares):
+            self._strides.append(size)
+            size *= len(squares)
+        self._strides.reverse()
+        self._size = size
+        self._values = values
+        self._map = None
+
+    def get_material(self):
+        """returns the material name, i.e. "KRkaa" """
+        return self._material
+
+    def get_codes(self):
+        """returns the piece codes in index order"""
+        return self._codes
+
+    def __len__(self):
+        """returns the number of positions indexed, every placement with either player to move"""
+        return self._size
+
+    def index(self, pieces, turn):
+        """
+        returns the index of a position, or None if a piece is on a square it can't stand on
+        :param pieces - square of each piece, in get_codes() order
+        :param turn - 0 for red to move, 1 for black
+        """
+        index = turn
+        for places, stride, sq in zip(self._places, self._strides, pieces):
+            place = places[sq]
+            if place < 0:
+                return None
+            index += place * stride
+        return index
+
+    def decode(self, index):
+        """
+        returns the square of each piece and the player to move of a position index
+        :param index - position index
+        """
+        turn = index & 1
+        index >>= 1
+        pieces = []
+        for squares in reversed(self._squares):
+            index, place = divmod(index, len(squares))
+            pieces.append(squares[place])
+        pieces.reverse()
+        return pieces, turn
+
+    def position_index(self, squares, turn):
+        """
+        returns the index of a board position with this table's material, or None if it can't be indexed
+        :param squares - 90 piece codes
+        :param turn - 0 for red to move, 1 for black
+        """
+        found = {}
+        for sq, code in enumerate(squares):
+            if code:
+                found.setdefault(code, []).append(sq)
+        pieces = []
+        for code in self._codes:
+            squares_of_code = found.get(code)
+            if not squares_of_code:
+                return None
+            pieces.append(squares_of_code.pop())
+        return self.index(pieces, turn)
+
+    def value(self, index):
+        """
+        returns the value of a position index: moves to the end of the game, odd for a win and even for a loss of the
+        player to move, or DRAW or INVALID
+        :param index - position index
+        """
+        return self._values[index]
+
+    def save(self, path):
+        """
+        writes the values to a tablebase file
+        :param path - file to write
+        """
+        values = array("h", self._values)
+        if sys.byteorder != "little":
+            values.byteswap()
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self._material.encode(), self._size))
+            file.write(values.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        returns the tablebase stored in a file, memory mapped read only so processes share one copy, raises ValueError
+        if the file isn't a tablebase
+        :param path - tablebase file
+        """
+        with open(path, "rb") as file:
+            try:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # an empty file can't be mapped
+                raise ValueError(path + " is not a tablebase")
+        if len(data) < HEADER.size:
+            data.close()
+            raise ValueError(path + " is not a tablebase")
+        magic, version, material, size = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or len(data) != HEADER.size + 2 * size:
+            data.close()
+            raise ValueError(path + " is not a tablebase")
+        view = memoryview(data)[HEADER.size:].cast("h")
+        values = view
+        if sys.byteorder != "little":
+            values = array("h", view)
+            values.byteswap()
+        try:
+            material = material.rstrip(b"\0").decode("ascii")
+            table = cls(material, values)
+            if len(table) != size:
+                raise ValueError(path + " does not match its material " + material)
+        except ValueError:
+            view.release()  # the map can't close while a view of it is held
+            data.close()
+            raise
+        table._map = data
+        return table
+
+    def submaterials(self):
+        """returns the material names left after capturing any one piece"""
+        return sorted({material_name(self._codes[:at] + self._codes[at + 1:])
+                       for at, code in enumerate(self._codes) if code & 7 != GENERAL})
+
+    def predecessors(self, index):
+        """
+        yields the index of every position one move without a capture before a position, valid or not
+        :param index - position index
+        """
+        pieces, turn = self.decode(index)
+        occupied = bytearray(SQUARES)
+        for sq in pieces:
+            occupied[sq] = 1
+        mover = turn ^ 1  # the player who made the last move
+        base = index - turn + mover
+        for at, code in enumerate(self._codes):
+            if code >> 3 != mover:
+                continue
+            kind = code & 7
+            end = pieces[at]
+            if kind in (CHARIOT, CANNON):
+                starts = []
+                for ray in _RAYS[end]:
+                    for sq in ray:
+                        if occupied[sq]:
+                            break
+                        starts.append(sq)
+            elif kind == HORSE:
+                starts = [sq for sq, leg in _HORSE_ATTACKERS[end] if not occupied[leg]]
+            elif kind == ELEPHANT:
+                starts = [sq for sq, eye in _ELEPHANT_MOVES[end] if not occupied[eye]]
+            elif kind == SOLDIER:
+                starts = _SOLDIER_ATTACKERS[mover][end]
+            elif kind == ADVISOR:
+                starts = _ADVISOR_MOVES[end]
+            else:
+                starts = _GENERAL_MOVES[end]
+            places = self._places[at]
+            stride = self._strides[at]
+            place = places[end]
+            for sq in starts:
+                if not occupied[sq] and places[sq] >= 0:
+                    yield base + (places[sq] - place) * stride
+
+
+class Tablebases:
+    """
+    Represents a directory of tablebase files, loaded when first needed, with methods to look up a Board's position
+    and to pick a tablebase move.
+    """
+
+    def __init__(self, directory="."):
+        """
+        Constructs a set of tablebases with private data members of the directory and the tables loaded so far.
+        :param directory - directory holding the tablebase files
+        """
+        self._directory = directory
+        self._tables = {}
+
+    def get_table(self, material):
+        """
+        returns the Tablebase of a material set, or None if there is no file for it
+        :param material - material name
+        """
+        if material not in self._tables:
+            path = os.path.join(self._directory, material + EXTENSION)
+            self._tables[material] = Tablebase.load(path) if os.path.exists(path) else None
+        return self._tables[material]
+
+    def lookup(self, squares, turn):
+        """
+        returns the value of a position, or None if no table covers its material
+        :param squares - 90 piece codes
+        :param turn - 0 for red to move, 1 for black
+        """
+        codes = [code for code in squares if code]
+        table = self.get_table(material_name(codes))
+        if table is None:
+            table = self.get_table(material_name([code ^ BLACK_PIECE for code in codes]))
+            if table is None:
+                return None
+            squares, turn = _mirror(squares), turn ^ 1
+        index = table.position_index(squares, turn)
+        return None if index is None else table.value(index)
+
+    def probe(self, board):
+        """
+        returns the value of a Board's position, or None if no table covers its material
+        :param board - Board to look up
+        """
+        return self.lookup(board.get_squares(), PLAYER_INDEX[board.get_turn()])
+
+    def best_move(self, board):
+        """
+        returns the tablebase move of a Board's position as (start, end) square indices: the quickest win, the
+        slowest loss or a move keeping the draw, or None if no table covers the position
+        :param board - Board to find a move for
+        """
+        value = self.probe(board)
+        if value is None or value < DRAW or value == 0:
+            return None
+        best = best_value = None
+        for start, end in board.moves():
+            board.make_move(start, end)
+            child = self.probe(board)
+            board.unmake_move()
+            if child is None or child == INVALID:
+                continue
+            if value == DRAW:
+                score = 0 if child == DRAW else (1 if child % 2 == 0 else -1)
+            elif value % 2:
+                score = -child if child >= 0 and child % 2 == 0 else None  # win: quickest loss for the other side
+            else:
+                score = child  # loss: the other side's slowest win
+            if score is not None and (best_value is None or score > best_value):
+                best, best_value = (start, end), score
+        return best
+
+
+def _scan(material, directory, start, stop):
+    """
+    works out the valid positions, their number of legal moves and the captures into smaller tables for a range of
+    position indices, run in a worker process; returns the valid flags, move counts and (index, captured value) pairs
+    for captures into positions that aren't drawn
+    :param material - material name
+    :param directory - directory holding the smaller tables
+    :param start - first position index
+    :param stop - position index after the last
+    """
+    table = Tablebase(material)
+    tables = Tablebases(directory)
+    codes = table.get_codes()
+    board = Board()
+    valid = bytearray(stop - start)
+    counts = bytearray(stop - start)
+    captures = []
+    for index in range(start, stop):
+        pieces, turn = table.decode(index)
+        if len(set(pieces)) != len(pieces):
+            continue
+        squares = bytearray(SQUARES)
+        for code, sq in zip(codes, pieces):
+            squares[sq] = code
+        board.set_position(squares, PLAYERS[turn])
+        if board.gen_check(PLAYERS[turn]) != "NONE":
+            continue  # the player who just moved is in check
+        valid[index - start] = 1
+        moves = board.moves()
+        counts[index - start] = len(moves)
+        for move_from, move_to in moves:
+            if squares[move_to]:
+                after = bytearray(squares)
+                after[move_to], after[move_from] = after[move_from], 0
+                value = tables.lookup(after, turn ^ 1)
+                if value is None:
+                    raise ValueError("missing tablebase for a capture from " + material)
+                if value >= 0:
+                    captures.append((index, value))
+    return valid, counts, captures
+
+
+def generate(material, directory=".", workers=1, chunk_size=1 << 16):
+    """
+    generates a material set's tablebase and saves it in a directory, generating any missing smaller tables that
+    captures lead to first; returns the Tablebase
+    :param material - FEN letters of every piece, i.e. "KRkaa"
+    :param directory - directory to save the tablebase files in
+    :param workers - number of worker processes for the position scan, None for one per CPU
+    :param chunk_size - position indices scanned by a worker at once
+    """
+    table = Tablebase(material)
+    for sub in table.submaterials():
+        if not os.path.exists(os.path.join(directory, sub + EXTENSION)):
+            generate(sub, directory, workers, chunk_size)
+    size = len(table)
+    ranges = [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+    material = table.get_material()
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1:
+        results = [_scan(material, directory, start, stop) for start, stop in ranges]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_scan, [material] * len(ranges), [directory] * len(ranges),
+                                    [start for start, stop in ranges], [stop for start, stop in ranges]))
+    values = array("h", [INVALID]) * size
+    counts = bytearray()
+    pending = {}  # depth -> positions with a capture into a smaller table decided at that depth
+    for (start, stop), (valid, chunk_counts, captures) in zip(ranges, results):
+        counts += chunk_counts
+        for offset, flag in enumerate(valid):
+            if flag:
+                values[start + offset] = DRAW
+        for index, value in captures:
+            pending.setdefault(value, []).append(index)
+    # positions with no legal move are lost, then work backward one move at a time
+    resolved = {0: []}
+    for index in range(size):
+        if values[index] == DRAW and not counts[index]:
+            values[index] = 0
+            resolved[0].append(index)
+    depth = 0
+    while resolved.get(depth) or any(later >= depth for later in pending):
+        children = [(child, depth) for child in resolved.pop(depth, ())]
+        children += [(index, None) for index in pending.pop(depth, ())]
+        for index, child in children:
+            # a child from this table leads back to all its predecessors, a capture only to the capturing position
+            parents = table.predecessors(index) if child is not None else (index,)
+            for parent in parents:
+                if values[parent] != DRAW:
+                    continue
+                if depth % 2 == 0:
+                    values[parent] = depth + 1  # a move to a lost position wins
+                    resolved.setdefault(depth + 1, []).append(parent)
+                else:
+                    counts[parent] -= 1  # a move to a won position loses, the position is lost once every move does
+                    if not counts[parent]:
+                        values[parent] = depth + 1
+                        resolved.setdefault(depth + 1, []).append(parent)
+        depth += 1
+    table = Tablebase(material, values)
+    table.save(os.path.join(directory, material + EXTENSION))
+    return table
+
+
+def main(argv=None):
+    """
+    generates tablebases from the command line, printing each table's win, loss and draw counts
+    :param argv - command line arguments, or None for sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Generate Xiangqi endgame tablebases")
+    parser.add_argument("materials", nargs="+", help="material sets in FEN letters, i.e. KRkaa")
+    parser.add_argument("--directory", default=".", help="directory for the tablebase files")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, default one per CPU")
+    args = parser.parse_args(argv)
+    os.makedirs(args.directory, exist_ok=True)
+    for material in args.materials:
+        table = generate(material, args.directory, args.workers)
+        values = [table.value(index) for index in range(len(table))]
+        wins = sum(1 for value in values if value > 0 and value % 2)
+        losses = sum(1 for value in values if value >= 0 and not value % 2)
+        print(table.get_material() + ": " + str(wins) + " won, " + str(losses) + " lost, " +
+              str(values.count(DRAW)) + " drawn, longest " + str(max(values)) + " plies", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
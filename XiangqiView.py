@@ -0,0 +1,120 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: Rendering and compact serialization of Xiangqi positions for spectators. Everything here works on the
+# immutable 91 byte snapshots from Board.snapshot and XiangqiGame.snapshot (90 piece codes then the player to move), so
+# it never touches a game being played. Rendered text is cached by snapshot, and a SpectatorFeed turns a game's moves
+# into frames to broadcast:
+#     "F" + snapshot                        a full position, 92 bytes, sent to new spectators and to resynchronize
+#     "D" + player to move + (square, code) pairs for every changed square, 6 bytes for a move
+# i.e.
+#     feed = SpectatorFeed(game)
+#     send_to_new_spectator(feed.keyframe())
+#     frame = feed.poll()  # after a move, None if nothing changed
+#     position = apply_frame(position, frame)  # on the spectator's side
+
+from functools import lru_cache
+
+from XiangqiGame import SQUARES, render_squares
+
+FULL = b"F"
+DIFF = b"D"
+
+
+@lru_cache(maxsize=4096)
+def render_snapshot(snapshot):
+    """
+    returns the text of a snapshot's board as Board.print_board prints it, cached for recently rendered positions
+    :param snapshot - position snapshot
+    """
+    return render_squares(snapshot[:SQUARES])
+
+
+def encode_diff(before, after):
+    """
+    returns the diff turning one snapshot into another: the player to move then a (square, code) byte pair for every
+    square that changed
+    :param before - position snapshot
+    :param after - position snapshot
+    """
+    diff = bytearray(after[SQUARES:])
+    for sq in range(SQUARES):
+        if before[sq] != after[sq]:
+            diff.append(sq)
+            diff.append(after[sq])
+    return bytes(diff)
+
+
+def apply_diff(snapshot, diff):
+    """
+    returns the snapshot a diff from encode_diff leads to
+    :param snapshot - position snapshot the diff was made from
+    :param diff - diff bytes
+    """
+    if len(snapshot) != SQUARES + 1 or not diff or len(diff) % 2 != 1:
+        raise ValueError("not a snapshot and diff")
+    position = bytearray(snapshot)
+    position[SQUARES] = diff[0]
+    for at in range(1, len(diff), 2):
+        position[diff[at]] = diff[at + 1]
+    return bytes(position)
+
+
+def apply_frame(snapshot, frame):
+    """
+    returns the snapshot after a SpectatorFeed frame
+    :param snapshot - position snapshot before the frame, or None if no full frame has been seen
+    :param frame - frame bytes
+    """
+    kind, body = frame[:1], frame[1:]
+    if kind == FULL and len(body) == SQUARES + 1:
+        return bytes(body)
+    if kind == DIFF and snapshot is not None:
+        return apply_diff(snapshot, body)
+    raise ValueError("not a frame that follows the snapshot")
+
+
+class SpectatorFeed:
+    """
+    Represents the frames of one game sent to its spectators, with methods to poll the game for the next frame and to
+    get a full frame for a new spectator. The last frame is cached, so one feed serves every spectator of a game.
+    """
+
+    def __init__(self, game, keyframe_every=0):
+        """
+        Constructs a feed with private data members of the game, the snapshot last sent and the frames since the last
+        full frame.
+        :param game - XiangqiGame to follow
+        :param keyframe_every - send a full frame after this many diffs, 0 for only diffs
+        """
+        self._game = game
+        self._keyframe_every = keyframe_every
+        self._snapshot = game.snapshot()
+        self._frame = FULL + self._snapshot
+        self._diffs = 0
+
+    def keyframe(self):
+        """returns a full frame of the position last sent"""
+        return FULL + self._snapshot
+
+    def get_frame(self):
+        """returns the frame last sent"""
+        return self._frame
+
+    def render(self):
+        """returns the text of the position last sent, see render_snapshot"""
+        return render_snapshot(self._snapshot)
+
+    def poll(self):
+        """returns the frame for the game's position since the last poll, or None if it hasn't changed"""
+        snapshot = self._game.snapshot()
+        if snapshot == self._snapshot:
+            return None
+        if self._keyframe_every and self._diffs >= self._keyframe_every:
+            frame = FULL + snapshot
+            self._diffs = 0
+        else:
+            frame = DIFF + encode_diff(self._snapshot, snapshot)
+            self._diffs += 1
+        self._snapshot = snapshot
+        self._frame = frame
+        return frame
@@ -0,0 +1,78 @@
+# Author: Xiangqi contributors
+# Date: 10-16-2026
+# Description: Tests of XiangqiEncode, run with python -m unittest or pytest. Skipped when NumPy isn't installed.
+
+import unittest
+
+from XiangqiGame import SQUARE_INDEX, START_FEN, Board
+
+try:
+    import numpy as np
+    from XiangqiEncode import PLANE_CODES, PLANES, encode_boards, encode_games, game_positions
+except ImportError:
+    np = None
+
+OPENING = [("h3", "e3"), ("h10", "g8"), ("h1", "g3")]
+FROM_FEN = ("4k4/9/9/9/9/9/9/9/4A4/3AK4 w - - 0 1", [("e1", "f1")])
+
+
+@unittest.skipIf(np is None, "NumPy isn't installed")
+class EncodeGamesTest(unittest.TestCase):
+    """tests encoding games and boards into batches"""
+
+    def encode(self, games, batch_size=4096):
+        """returns the batches of some games and the (index, error) of each game skipped"""
+        skipped = []
+        batches = list(encode_games(games, batch_size, skipped=lambda index, error: skipped.append((index, error))))
+        return batches, skipped
+
+    def test_shapes(self):
+        """every position of a game is encoded, the last batch holding the rest"""
+        batches, skipped = self.encode([OPENING, FROM_FEN], batch_size=4)
+        self.assertEqual(skipped, [])
+        self.assertEqual([len(batch["side"]) for batch in batches], [4, 2])
+        self.assertEqual(batches[0]["planes"].shape, (4, PLANES, 10, 9))
+        self.assertEqual(batches[0]["planes"].dtype, np.float32)
+        self.assertEqual(batches[0]["legal"].shape, (4, 90, 90))
+        self.assertEqual(batches[0]["side"].tolist(), [0, 1, 0, 1])
+
+    def test_matches_board(self):
+        """planes show each piece once and the legal masks are the Board's legal moves"""
+        (batch,), _ = self.encode([OPENING])
+        board = Board()
+        for at in range(len(OPENING) + 1):
+            squares = board.get_squares()
+            for plane, code in enumerate(PLANE_CODES):
+                self.assertEqual(batch["planes"][at, plane].flatten().tolist(), [code == piece for piece in squares])
+            legal = [(int(start), int(end)) for start, end in zip(*np.nonzero(batch["legal"][at]))]
+            self.assertEqual(legal, sorted(board.moves()))
+            if at < len(OPENING):
+                start, end = OPENING[at]
+                board.make_move(SQUARE_INDEX[start], SQUARE_INDEX[end])
+        self.assertEqual(batch["side"].tolist(), [0, 1, 0, 1])
+
+    def test_game_positions(self):
+        """a game's positions run from its start through the position after its last move"""
+        fen, moves = FROM_FEN
+        positions = list(game_positions(moves, Board(fen=fen)))
+        self.assertEqual([side for codes, side, legal in positions], [0, 1])
+        self.assertIn((SQUARE_INDEX["e1"], SQUARE_INDEX["f1"]), positions[0][2])
+
+    def test_bad_games_skipped(self):
+        """a game with a malformed or illegal move or FEN is reported and none of its positions are encoded"""
+        games = [OPENING, OPENING[:2] + [("zz", "a1")], [("h3", "h9")], ("not a fen", []), OPENING[:1]]
+        batches, skipped = self.encode(games)
+        self.assertEqual([index for index, error in skipped], [1, 2, 3])
+        self.assertTrue(all(isinstance(error, ValueError) for index, error in skipped))
+        self.assertEqual(len(batches[0]["side"]), len(OPENING) + 1 + 2)
+
+    def test_encode_boards(self):
+        """one batch holds the current position of each board"""
+        batch = encode_boards([Board(), Board(fen=START_FEN.replace(" w ", " b "))], legal=False)
+        self.assertEqual(batch["side"].tolist(), [0, 1])
+        self.assertNotIn("legal", batch)
+        self.assertEqual(batch["planes"].sum(axis=(1, 2, 3)).tolist(), [32, 32])
+
+
+if __name__ == "__main__":
+    unittest.main()